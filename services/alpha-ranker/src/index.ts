@@ -3,7 +3,7 @@ import fs from 'fs';
 import path from 'path';
 import EventSource from 'eventsource';
 import { createInMemoryLastEventIdStore, subscribeJsonStream, sseQueue, sseRoute, resolveServiceUrl } from '@trenches/util';
-import { registerGauge } from '@trenches/metrics';
+import { getRegistry, registerGauge } from '@trenches/metrics';
 import Fastify from 'fastify';
 import helmet from '@fastify/helmet';
 import rateLimit from '@fastify/rate-limit';
@@ -39,7 +39,7 @@ type AlphaModelPayload = {
 };
 
 const MODEL_STATUS_LABELS = ['ok', 'degraded', 'missing', 'error', 'unknown'] as const;
-const modelVersionGauge = registerGauge({ name: 'alpha_model_epoch_seconds', help: 'Alpha model created timestamp (unix seconds)' });
+const modelVersionGauge = registerGauge({ name: 'alpha_model_epoch_seconds', help: 'Alpha model created timestamp (unix seconds, ms precision)' });
 const modelStatusGauge = registerGauge({ name: 'alpha_model_status', help: 'Alpha model status indicator (1 if active, 0 otherwise)', labelNames: ['status'] });
 
 let alphaWeights: { features: string[]; weights: Record<string, number[]>; status: string } | null = null;
@@ -52,7 +52,7 @@ function setAlphaModelStatus(status: string, created?: string): void {
   const normalized = MODEL_STATUS_LABELS.includes(status as any) ? (status as typeof MODEL_STATUS_LABELS[number]) : 'unknown';
   const createdTs = created ? Date.parse(created) : Date.now();
   if (!Number.isNaN(createdTs)) {
-    modelVersionGauge.set(Math.floor(createdTs / 1000));
+    modelVersionGauge.set(createdTs / 1000);
   }
   for (const label of MODEL_STATUS_LABELS) {
     modelStatusGauge.labels({ status: label }).set(label === normalized ? 1 : 0);
@@ -344,6 +344,12 @@ async function bootstrap() {
     reply.send(result);
   });
 
+  app.get('/metrics', async (_, reply) => {
+    const registry = getRegistry();
+    reply.header('Content-Type', registry.contentType);
+    reply.send(await registry.metrics());
+  });
+
   app.get('/healthz', async () => {
     const lunarStatus = lunar.getStatus();
     const baseStatus = offline ? 'degraded' : 'ok';
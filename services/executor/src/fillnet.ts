@@ -27,12 +27,14 @@ const timeExpGauge = registerGauge({ name: 'fillnet_time_expected_ms', help: 'Ex
 const calibBucket = registerCounter({ name: 'fillnet_calib_bucket', help: 'FillNet predictions by bucket', labelNames: ['bucket'] });
 const fillnetInsertPredErrors = registerCounter({ name: 'fillnet_insert_pred_errors_total', help: 'FillNet prediction persist errors' });
 const brierGauge = registerGauge({ name: 'fillnet_calib_brier', help: 'Approximate Brier score (expected)' });
-const modelVersionGauge = registerGauge({ name: 'fillnet_model_epoch_seconds', help: 'Model created timestamp (unix seconds)' });
+const modelVersionGauge = registerGauge({ name: 'fillnet_model_epoch_seconds', help: 'Model created timestamp (unix seconds, ms precision)' });
 const modelStatusGauge = registerGauge({ name: 'fillnet_model_status', help: 'Model status indicator (1 if active for given label, 0 otherwise)', labelNames: ['status'] });
 const MODEL_STATUS_LABELS = ['ok', 'degraded', 'missing', 'error', 'unknown'] as const;
 let currentModelStatus: typeof MODEL_STATUS_LABELS[number] = 'unknown';
 
-type FillnetModel = { wFill?: number[]; wSlip?: number[]; wTime?: number[] };
+type FillnetWeights = { wFill?: number[]; wSlip?: number[]; wTime?: number[] };
+type FillnetRouteWeights = FillnetWeights & { congestion?: Record<string, FillnetWeights> };
+type FillnetModel = FillnetWeights & { routes?: Record<string, FillnetRouteWeights>; congestionEdges?: number[] };
 let model: FillnetModel | null = null;
 let modelMeta: Record<string, unknown> | null = null;
 const modelBus = new EventEmitter();
@@ -41,7 +43,7 @@ function setModelStatus(status: string, created?: string): void {
   const normalized = MODEL_STATUS_LABELS.includes(status as any) ? status : 'unknown';
   const createdTs = created ? Date.parse(created) : Date.now();
   if (!Number.isNaN(createdTs)) {
-    modelVersionGauge.set(Math.floor(createdTs / 1000));
+    modelVersionGauge.set(createdTs / 1000);
   }
   for (const label of MODEL_STATUS_LABELS) {
     modelStatusGauge.labels({ status: label }).set(label === normalized ? 1 : 0);
@@ -57,7 +59,13 @@ function loadModel(): void {
     const modelPath = (cfg as any).fillnet?.modelPath ?? path.join('models', 'fillnet_v2.json');
     if (fs.existsSync(modelPath)) {
       const raw = JSON.parse(fs.readFileSync(modelPath, 'utf-8'));
-      model = { wFill: raw?.wFill, wSlip: raw?.wSlip, wTime: raw?.wTime };
+      model = {
+        wFill: raw?.wFill,
+        wSlip: raw?.wSlip,
+        wTime: raw?.wTime,
+        routes: raw?.routes && typeof raw.routes === 'object' ? raw.routes : undefined,
+        congestionEdges: Array.isArray(raw?.congestion_edges) ? raw.congestion_edges : undefined
+      };
       modelMeta = raw;
       logger.info(
         {
@@ -83,6 +91,20 @@ function loadModel(): void {
   }
 }
 
+// Route model (optionally per congestion bucket) when the trainer emitted one, else the global weights
+function selectWeights(route: string, sCong: number): FillnetWeights | null {
+  if (!model) return null;
+  const routeModel = model.routes?.[route];
+  if (!routeModel) return model;
+  const edges = model.congestionEdges;
+  if (edges && routeModel.congestion) {
+    const bucket = edges.filter((edge) => sCong >= edge).length;
+    const bucketModel = routeModel.congestion[String(bucket)];
+    if (bucketModel) return bucketModel;
+  }
+  return routeModel;
+}
+
 function ensureModel(): void {
   if (model !== null) return;
   loadModel();
@@ -118,11 +140,12 @@ export async function predictFill(ctx: PredictContext, persistCtx?: Record<strin
   const sSlipReq = Math.min(1, slipReq / 300);
   const feats = [1, sDepth, sCong, sSpread, sVol, sAge, sRug, sSlipReq];
   const dot = (w: number[]|undefined) => (w && w.length === feats.length) ? w.reduce((a, wi, i) => a + wi * feats[i], 0) : null;
-  const zFill = dot(model?.wFill ?? undefined);
+  const weights = selectWeights(ctx.route, sCong);
+  const zFill = dot(weights?.wFill ?? undefined);
   const pFill = zFill !== null ? (1 / (1 + Math.exp(-(zFill as number)))) : (1 / (1 + Math.exp(-(2.2 * sDepth + 1.5 * sCong + 0.8 * sSpread + 0.7 * sVol + 0.2 * sAge + 0.8 * sRug + 0.6 * sSlipReq - 3.0))));
-  const zSlip = dot(model?.wSlip ?? undefined);
+  const zSlip = dot(weights?.wSlip ?? undefined);
   const expSlipBps = zSlip !== null ? Math.max(1, Math.round(zSlip as number)) : Math.max(5, Math.round((spread * 0.4 + vol * 0.3 + (1 - sDepth) * 120 + (1 - sCong) * 80)));
-  const zTime = dot(model?.wTime ?? undefined);
+  const zTime = dot(weights?.wTime ?? undefined);
   const expTimeMs = zTime !== null ? Math.max(50, Math.round(zTime as number)) : Math.max(200, Math.round(400 + (1 - sCong) * 900 + (1 - sDepth) * 700 + (spread / 200) * 500));
   const pred: FillPrediction = { ts, route: ctx.route, pFill, expSlipBps, expTimeMs };
   try {
@@ -9,7 +9,8 @@ SELECT
   COALESCE(eo.slippage_bps_real, 0)     AS y_slip_bps,
   COALESCE(eo.time_to_land_ms, 0)       AS y_ttl_ms,
   COALESCE(eo.slippage_bps_req, 0)      AS req_slippage_bps,
-  COALESCE(eo.cu_price, 0)              AS req_cu_price
+  COALESCE(eo.cu_price, 0)              AS req_cu_price,
+  'real'                                AS source
 FROM exec_outcomes eo
 WHERE (CASE WHEN eo.ts > 20000000000 THEN eo.ts/1000 ELSE eo.ts END) >= strftime('%s','now') - 90*24*3600
   AND eo.route IS NOT NULL
@@ -22,7 +23,8 @@ SELECT
   COALESCE(se.slippage_bps_real, 0),
   COALESCE(se.time_to_land_ms, 0),
   COALESCE(se.slippage_bps_req, 0),
-  COALESCE(se.cu_price, 0)
+  COALESCE(se.cu_price, 0),
+  'sim'
 FROM sim_exec_outcomes se
 WHERE (CASE WHEN se.ts > 20000000000 THEN se.ts/1000 ELSE se.ts END) >= strftime('%s','now') - 90*24*3600;
 
@@ -0,0 +1,146 @@
+"""
+python -m training_py <command> [target] [args...]
+
+Single entry point for the training scripts. Nothing heavier than argparse is
+imported until a command is chosen, and the scripts themselves only load
+sklearn/scipy/xgboost once there is something to fit, so --help, device
+checks and no-data exits start in a fraction of a second. Arguments after the
+target go to that script's own parser (`train alpha --force`).
+"""
+from __future__ import annotations
+
+import argparse
+import importlib
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple, Union
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# The scripts import their siblings flat (from util_ds import ...), as when run as python training_py/x.py
+if HERE not in sys.path:
+    sys.path.insert(0, HERE)
+
+# command -> module, or command -> {target: module}; each module exposes main()
+COMMANDS: Dict[str, Union[str, Dict[str, str]]] = {
+    'train': {
+        'fillnet': 'fillnet_train_xgb',
+        'alpha': 'alpha_ranker_train',
+        'rugguard': 'rugguard_train',
+        'survival': 'survival_train',
+        'daemon': 'trainer_daemon',
+    },
+    'promote': 'promote_gpu',
+    'bench': 'backtest_vec',
+    'score': {
+        'drift': 'drift',
+        'parity': 'parity',
+    },
+}
+HELP = {
+    'train': 'fit a model candidate (or run the retrain daemon)',
+    'promote': 'gate candidates with backtest/OPE and promote the winners',
+    'device': 'report whether training will run on GPU or CPU',
+    'bench': 'vectorised multi-candidate alpha backtest',
+    'score': 'compare live logged scores against the training data (drift, parity)',
+}
+PROG = 'python -m training_py'
+IMPORT_PROFILE_TOP = 15
+
+
+def _run(module: str, prog: str, argv: List[str]) -> None:
+    sys.argv = [prog, *argv]
+    importlib.import_module(module).main()
+
+
+def _device(argv: List[str]) -> None:
+    parser = argparse.ArgumentParser(prog=f'{PROG} device')
+    parser.add_argument('--xgb-info', action='store_true', help='also print the xgboost version and device support')
+    args = parser.parse_args(argv)
+    from gpu_util import prefer_gpu, print_device
+
+    print_device(prefer_gpu())
+    if args.xgb_info:
+        importlib.import_module('xgb_info')
+
+
+def _import_line(line: str) -> Tuple[int, str] | None:
+    """(cumulative us, name) of a top-level -X importtime record, None for nested imports and the header."""
+    fields = line[len('import time:'):].split('|')
+    if len(fields) != 3 or not fields[1].strip().isdigit():
+        return None
+    name = fields[2]
+    # Nesting is shown as two extra spaces per level after the single separator space
+    if name[:2] == '  ':
+        return None
+    return int(fields[1]), name.strip()
+
+
+def _import_profile(argv: List[str], top: int = IMPORT_PROFILE_TOP) -> int:
+    """Re-run the command under -X importtime and summarise import cost by top-level package."""
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, '-X', 'importtime', os.path.abspath(__file__), *argv],
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    packages: Dict[str, int] = {}
+    for line in proc.stderr:
+        if not line.startswith('import time:'):
+            sys.stderr.write(line)
+            continue
+        record = _import_line(line)
+        if record is not None:
+            cumulative, name = record
+            root = name.split('.')[0]
+            packages[root] = packages.get(root, 0) + cumulative
+    code = proc.wait()
+    wall = time.perf_counter() - started
+    imports = sum(packages.values()) / 1e6
+    print(f'import_profile: wall={wall:.2f}s imports={imports:.2f}s modules={len(packages)}', file=sys.stderr)
+    for name, us in sorted(packages.items(), key=lambda kv: -kv[1])[:top]:
+        print(f'  {name:<24} {us / 1e6:7.3f}s', file=sys.stderr)
+    return code
+
+
+def _parser() -> argparse.ArgumentParser:
+    labels = {}
+    for name in HELP:
+        targets = COMMANDS.get(name)
+        labels[name] = f"{name} {{{','.join(targets)}}}" if isinstance(targets, dict) else name
+    width = max(len(label) for label in labels.values())
+    lines = [f'  {labels[name]:<{width}}  {HELP[name]}' for name in HELP]
+    parser = argparse.ArgumentParser(
+        prog=PROG,
+        description='Trenches training entry point.',
+        epilog='commands:\n' + '\n'.join(lines),
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument('--import-profile', action='store_true', help='report import time per top-level package after the command')
+    parser.add_argument('command', choices=list(HELP), metavar='command')
+    parser.add_argument('args', nargs=argparse.REMAINDER, help='target and arguments for the command')
+    return parser
+
+
+def main() -> None:
+    parser = _parser()
+    args = parser.parse_args()
+    if args.import_profile:
+        sys.exit(_import_profile([args.command, *args.args]))
+
+    if args.command == 'device':
+        _device(args.args)
+        return
+    targets = COMMANDS[args.command]
+    if isinstance(targets, str):
+        _run(targets, f'{PROG} {args.command}', args.args)
+        return
+    if not args.args or args.args[0] not in targets:
+        parser.error(f"{args.command} needs a target: {', '.join(targets)}")
+    target, rest = args.args[0], args.args[1:]
+    _run(targets[target], f'{PROG} {args.command} {target}', rest)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,16 +1,18 @@
 from __future__ import annotations
 
+import argparse
 import json
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Iterable, Tuple, Dict, Any
+from typing import TYPE_CHECKING, Iterable, Optional, Tuple, Dict, Any
 
 import numpy as np
-import pandas as pd
-from sklearn.linear_model import LogisticRegression
-from sklearn.metrics import roc_auc_score
 
-from util_ds import get_alpha_dataset
+# pandas and the data modules load inside the functions that use them, so --help stays cheap
+if TYPE_CHECKING:
+    import pandas as pd
+
+OUTPUT_PATH = Path('models') / 'alpha_ranker_v1.json'
 
 FEATURE_NAMES = [
     'bias',
@@ -28,6 +30,8 @@ FEATURE_NAMES = [
 
 
 def _pick_column(frame: pd.DataFrame, names: Iterable[str], default: float) -> pd.Series:
+    import pandas as pd
+
     for name in names:
         if name in frame.columns:
             return pd.to_numeric(frame[name], errors='coerce').fillna(default)
@@ -35,6 +39,8 @@ def _pick_column(frame: pd.DataFrame, names: Iterable[str], default: float) -> p
 
 
 def _build_feature_frame(df: pd.DataFrame) -> pd.DataFrame:
+    import pandas as pd
+
     buys = _pick_column(df, ['buys60', 'buys_60s', 'buy_count_60s'], 0.0)
     sells = _pick_column(df, ['sells60', 'sells_60s', 'sell_count_60s'], 0.0)
     uniques = _pick_column(df, ['uniques60', 'unique_traders_60s', 'unique_wallets_60s'], 0.0)
@@ -72,23 +78,17 @@ def _build_feature_frame(df: pd.DataFrame) -> pd.DataFrame:
             'lunar_boost': lunar_boost_clamped
         },
         index=df.index,
-    ).astype(float)
+    ).astype(np.float32)
     return features
 
 
-def _chronological_split(features: pd.DataFrame, labels: pd.Series, holdout_ratio: float = 0.2) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
-    mask = labels.notna()
-    feats = features[mask]
-    lbls = labels[mask].astype(float)
-    n = len(feats)
-    if n == 0:
-        return np.empty((0, feats.shape[1])), np.empty(0), np.empty((0, feats.shape[1])), np.empty(0)
+def _chronological_split(features: np.ndarray, labels: np.ndarray, holdout_ratio: float = 0.2) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    mask = ~np.isnan(labels)
+    if not mask.all():
+        features, labels = features[mask], labels[mask]
+    n = labels.shape[0]
     split = max(min(int(n * (1 - holdout_ratio)), n - 1), 1) if n > 8 else n
-    X_train = feats.iloc[:split].to_numpy(dtype=float)
-    y_train = lbls.iloc[:split].to_numpy(dtype=float)
-    X_holdout = feats.iloc[split:].to_numpy(dtype=float) if split < n else np.empty((0, feats.shape[1]))
-    y_holdout = lbls.iloc[split:].to_numpy(dtype=float) if split < n else np.empty(0)
-    return X_train, y_train, X_holdout, y_holdout
+    return features[:split], labels[:split], features[split:], labels[split:]
 
 
 def _precision_at_k(y_true: np.ndarray, y_score: np.ndarray, k: int = 50) -> float:
@@ -101,7 +101,7 @@ def _precision_at_k(y_true: np.ndarray, y_score: np.ndarray, k: int = 50) -> flo
     return float(np.mean(y_true[top] > 0.5))
 
 
-def _train_one_horizon(features: pd.DataFrame, labels: pd.Series) -> Dict[str, Any]:
+def _train_one_horizon(features: np.ndarray, labels: np.ndarray) -> Dict[str, Any]:
     X_train, y_train, X_holdout, y_holdout = _chronological_split(features, labels)
     result: Dict[str, Any] = {
         'weights': FEATURE_NAMES.copy(),
@@ -115,6 +115,10 @@ def _train_one_horizon(features: pd.DataFrame, labels: pd.Series) -> Dict[str, A
         result['weights'] = []
         return result
 
+    # sklearn costs ~2 s to import; only pay it once there is something to fit
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.metrics import roc_auc_score
+
     model = LogisticRegression(max_iter=1000, C=2.0, solver='lbfgs')
     model.fit(X_train[:, 1:], y_train)
     weights = [float(model.intercept_[0])] + [float(c) for c in model.coef_[0]]
@@ -134,34 +138,47 @@ def _train_one_horizon(features: pd.DataFrame, labels: pd.Series) -> Dict[str, A
     return result
 
 
-def main() -> None:
-    out_dir = Path('models')
-    out_dir.mkdir(exist_ok=True)
+def train_alpha(force: bool = False) -> Optional[dict]:
+    from drift import reference_histograms
+    from fingerprint import compact_fingerprint, dataset_fingerprint, read_model, unchanged
+    from social_features import social_features, social_fingerprint
+    from util_ds import get_alpha_compact
+
+    ds = get_alpha_compact(days=21)
+    # Author/social columns are aggregated from social_posts as of each entry; they change without the view changing
+    social = social_features(ds)
+    fingerprint = dataset_fingerprint({**compact_fingerprint(ds), 'social': social_fingerprint(social)}, __file__, str(Path(__file__).with_name('social_features.py')))
+    if not force and unchanged(read_model(OUTPUT_PATH), fingerprint):
+        return None
 
-    X_raw, y10, y60, _ = get_alpha_dataset(days=21)
     result = {
         'version': 2,
-        'created': datetime.now(timezone.utc).isoformat(timespec='seconds').replace('+00:00', 'Z'),
+        'created': datetime.now(timezone.utc).isoformat(timespec='milliseconds').replace('+00:00', 'Z'),
         'status': 'ok',
         'features': FEATURE_NAMES,
         'models': {},
         'metrics': {},
         'train_size': 0,
-        'holdout_size': 0
+        'holdout_size': 0,
+        'fingerprint': fingerprint
     }
 
-    if X_raw.empty or y10.empty or y60.empty:
+    y10 = ds.column('y_payoff_10m')
+    y60 = ds.column('y_payoff_60m')
+    if ds.empty or y10 is None or y60 is None:
         result['status'] = 'no_data'
-        (out_dir / 'alpha_ranker_v1.json').write_text(json.dumps(result, indent=2))
-        print('alpha_ranker: no_data')
-        return
+        return result
 
-    feature_frame = _build_feature_frame(X_raw)
+    frame = ds.frame()
+    for name, values in social.items():
+        frame[name] = values
+    feature_matrix = _build_feature_frame(frame).to_numpy(dtype=np.float32)
+    result['drift_reference'] = reference_histograms(feature_matrix[:, 1:], FEATURE_NAMES[1:])
 
     horizons = {'10m': y10, '60m': y60}
     overall_status = 'ok'
     for horizon, labels in horizons.items():
-        trained = _train_one_horizon(feature_frame, labels)
+        trained = _train_one_horizon(feature_matrix, labels)
         result['models'][horizon] = trained
         result['train_size'] = max(result['train_size'], trained.get('train_size', 0))
         result['holdout_size'] = max(result['holdout_size'], trained.get('holdout_size', 0))
@@ -181,8 +198,24 @@ def main() -> None:
         result['metrics'][horizon] = metrics
 
     result['status'] = overall_status
+    return result
 
-    (out_dir / 'alpha_ranker_v1.json').write_text(json.dumps(result, indent=2))
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--force', action='store_true', help='retrain even if the dataset fingerprint is unchanged')
+    args = parser.parse_args()
+    from fingerprint import write_model
+
+    OUTPUT_PATH.parent.mkdir(exist_ok=True)
+    result = train_alpha(force=args.force)
+    if result is None:
+        print('alpha_ranker: unchanged (fingerprint match, use --force to retrain)')
+        return
+    write_model(OUTPUT_PATH, result)
+    if result['status'] == 'no_data':
+        print('alpha_ranker: no_data')
+        return
     flattened = {k: v for k, v in result['metrics'].items() if not isinstance(v, dict)}
     print('alpha_ranker:', json.dumps(flattened))
 
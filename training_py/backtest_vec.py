@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from alpha_ranker_train import FEATURE_NAMES, _build_feature_frame
+from promote_gpu import MODELS, read_json
+
+# The pandas-backed data modules load in load_window, so --help stays cheap
+if TYPE_CHECKING:
+    from compact_ds import CompactDataset
+
+REPORT_PATH = Path('models') / 'backtest_vec.json'
+DEFAULT_DAYS = 14
+DEFAULT_THRESHOLDS = tuple(round(t, 2) for t in np.arange(0.5, 0.95, 0.05))
+# Candidates per drawdown block; keeps the (trades x block) cumsum cache-sized
+BLOCK_CANDIDATES = 8
+MIN_TRADES = 30
+# Same regime match as tools/backtest metrics.ts: exec outcome nearest in time to the trade
+EXEC_MATCH_SEC = 600
+
+
+class CandidateSet:
+    """K alpha candidates as one (features x K) weight matrix plus per-candidate score thresholds."""
+
+    def __init__(self) -> None:
+        self.names: List[str] = []
+        self._weights: List[np.ndarray] = []
+        self._thresholds: List[float] = []
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def add(self, name: str, weights: Sequence[float], threshold: float) -> None:
+        if len(weights) != len(FEATURE_NAMES):
+            raise ValueError(f'{name}: expected {len(FEATURE_NAMES)} weights, got {len(weights)}')
+        self.names.append(name)
+        self._weights.append(np.asarray(weights, dtype=np.float64))
+        self._thresholds.append(float(threshold))
+
+    def add_model(self, label: str, model: Optional[dict], thresholds: Sequence[float], horizons: Sequence[str] = ('10m', '60m')) -> None:
+        for horizon in horizons:
+            weights = ((model or {}).get('models', {}).get(horizon) or {}).get('weights') or []
+            if len(weights) != len(FEATURE_NAMES):
+                continue
+            for threshold in thresholds:
+                self.add(f'{label}:{horizon}@{threshold:.2f}', weights, threshold)
+
+    @property
+    def weights(self) -> np.ndarray:
+        return np.column_stack(self._weights) if self._weights else np.empty((len(FEATURE_NAMES), 0))
+
+    @property
+    def thresholds(self) -> np.ndarray:
+        return np.asarray(self._thresholds, dtype=np.float64)
+
+
+def _trade_costs(trades: CompactDataset, execs: CompactDataset) -> np.ndarray:
+    """Slippage cost per trade from the nearest filled exec outcome, as in metrics.ts."""
+    notional = np.nan_to_num(trades.column('notional'))
+    slip = execs.column('slip_bps')
+    filled = execs.column('filled')
+    if execs.empty or slip is None or filled is None:
+        return np.zeros(len(trades))
+    mask = np.nan_to_num(filled) > 0
+    ts, slip = execs.ts[mask], np.abs(np.nan_to_num(slip[mask]))
+    if ts.size == 0:
+        return np.zeros(len(trades))
+    right = np.clip(np.searchsorted(ts, trades.ts), 1, ts.size - 1) if ts.size > 1 else np.zeros(len(trades), dtype=np.int64)
+    left = np.maximum(right - 1, 0)
+    nearest = np.where(np.abs(ts[left] - trades.ts) <= np.abs(ts[right] - trades.ts), left, right)
+    matched = np.abs(ts[nearest] - trades.ts) <= EXEC_MATCH_SEC
+    return np.where(matched, notional * slip[nearest] / 10_000.0, 0.0)
+
+
+def load_window(days: float = DEFAULT_DAYS) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(features N x F, net PnL per trade, ts) loaded once for every candidate."""
+    from social_features import social_features
+    from util_ds import BACKTEST_BACKEND, get_backtest_window
+
+    trades, execs = get_backtest_window(days)
+    if trades.empty:
+        return np.empty((0, len(FEATURE_NAMES))), np.empty(0), np.empty(0, dtype=np.int64)
+    frame = trades.frame()
+    if BACKTEST_BACKEND != 'parquet':
+        # Same as-of social columns the candidates were trained with; social_posts is not exported
+        for name, values in social_features(trades).items():
+            frame[name] = values
+    features = _build_feature_frame(frame).to_numpy(dtype=np.float64)
+    gross = np.nan_to_num(trades.column('pnl_usd'))
+    return features, gross - _trade_costs(trades, execs), trades.ts
+
+
+def evaluate(features: np.ndarray, net: np.ndarray, candidates: CandidateSet) -> Dict[str, np.ndarray]:
+    """
+    Scores for all candidates as one (N x F) @ (F x K) product; gating, PnL,
+    hit-rate and max drawdown are reduced along the trade axis for every K at once.
+    Trades must be in ts order for the drawdown path.
+    """
+    W, thresholds = candidates.weights, candidates.thresholds
+    k = W.shape[1]
+    out = {name: np.zeros(k) for name in ('pnl', 'trades', 'hits', 'hit_rate', 'max_drawdown')}
+    if features.shape[0] == 0 or k == 0:
+        return out
+    net = np.asarray(net, dtype=np.float64)
+    # sigmoid(z) >= t  <=>  z >= logit(t): gate on raw scores, no exp over N x K
+    gates = np.log(np.clip(thresholds, 1e-9, 1 - 1e-9) / np.clip(1.0 - thresholds, 1e-9, None))
+    take = (features @ W) >= gates
+    takef = take.astype(np.float64)
+    out['pnl'] = net @ takef
+    out['trades'] = takef.sum(axis=0)
+    out['hits'] = (net > 0).astype(np.float64) @ takef
+    out['hit_rate'] = np.divide(out['hits'], out['trades'], out=np.zeros(k), where=out['trades'] > 0)
+    for start in range(0, k, BLOCK_CANDIDATES):
+        block = slice(start, start + BLOCK_CANDIDATES)
+        equity = np.cumsum(takef[:, block] * net[:, None], axis=0)
+        peak = np.maximum(np.maximum.accumulate(equity, axis=0), 0.0)
+        out['max_drawdown'][block] = (peak - equity).max(axis=0)
+    return out
+
+
+def report(candidates: CandidateSet, results: Dict[str, np.ndarray]) -> List[dict]:
+    rows = [
+        {
+            'candidate': name,
+            'pnl_usd': round(float(results['pnl'][i]), 4),
+            'trades': int(results['trades'][i]),
+            'hit_rate': round(float(results['hit_rate'][i]), 4),
+            'max_drawdown_usd': round(float(results['max_drawdown'][i]), 4),
+        }
+        for i, name in enumerate(candidates.names)
+    ]
+    return sorted(rows, key=lambda r: r['pnl_usd'], reverse=True)
+
+
+def alpha_promotion_check(current: Optional[dict], candidate: Optional[dict], days: float = DEFAULT_DAYS) -> Tuple[bool, str]:
+    """
+    Best-threshold PnL of the candidate vs the current alpha model over the
+    same window. Only blocks when both select enough trades to compare.
+    """
+    if not current:
+        return True, 'vec_backtest_no_current'
+    features, net, _ = load_window(days)
+    candidates = CandidateSet()
+    candidates.add_model('current', current, DEFAULT_THRESHOLDS, horizons=('10m',))
+    candidates.add_model('candidate', candidate, DEFAULT_THRESHOLDS, horizons=('10m',))
+    results = evaluate(features, net, candidates)
+    best: Dict[str, Tuple[float, int]] = {}
+    for i, name in enumerate(candidates.names):
+        label = name.split(':', 1)[0]
+        if results['trades'][i] >= MIN_TRADES and results['pnl'][i] > best.get(label, (-np.inf, 0))[0]:
+            best[label] = (float(results['pnl'][i]), int(results['trades'][i]))
+    if 'current' not in best or 'candidate' not in best:
+        return True, f'vec_backtest_insufficient_trades({features.shape[0]})'
+    cur_pnl, cand_pnl = best['current'][0], best['candidate'][0]
+    detail = f'cand={cand_pnl:.2f},cur={cur_pnl:.2f}'
+    return (cand_pnl >= cur_pnl, f'vec_backtest_ok({detail})' if cand_pnl >= cur_pnl else f'vec_backtest_worse({detail})')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--days', type=float, default=DEFAULT_DAYS)
+    parser.add_argument('--thresholds', default=','.join(f'{t:.2f}' for t in DEFAULT_THRESHOLDS), help='comma separated score gates applied to every model')
+    parser.add_argument('--candidates', default='', help='path to a JSON file listing {"name", "weights", "threshold"} to evaluate as well')
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args()
+
+    thresholds = [float(t) for t in args.thresholds.split(',') if t.strip()]
+    candidate_path, production_path, _ = MODELS['alpha']
+    candidates = CandidateSet()
+    candidates.add_model('production', read_json(production_path), thresholds)
+    candidates.add_model('candidate', read_json(candidate_path), thresholds)
+    if args.candidates:
+        for entry in json.loads(Path(args.candidates).read_text()):
+            candidates.add(entry['name'], entry['weights'], entry.get('threshold', 0.5))
+
+    features, net, _ = load_window(args.days)
+    rows = report(candidates, evaluate(features, net, candidates))
+    REPORT_PATH.parent.mkdir(exist_ok=True)
+    REPORT_PATH.write_text(json.dumps({'days': args.days, 'trades': int(features.shape[0]), 'candidates': rows}, indent=2))
+    print(f'backtest_vec: trades={features.shape[0]} candidates={len(candidates)}')
+    for row in rows[: args.top]:
+        print('backtest_vec:', json.dumps(row))
+
+
+if __name__ == '__main__':
+    main()
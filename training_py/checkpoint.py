@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import os
+import shutil
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+CHECKPOINT_DIR = Path('models') / 'checkpoints'
+MANIFEST = 'manifest.json'
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for block in iter(lambda: fh.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec='seconds').replace('+00:00', 'Z')
+
+
+def write_atomic(path: Path, data: bytes) -> None:
+    """Write via a fsynced sibling temp file and rename, so readers see the old or the new file, never a torn one."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+    with open(tmp, 'wb') as fh:
+        fh.write(data)
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp, path)
+
+
+def config_digest(config: Dict[str, Any]) -> str:
+    return hashlib.blake2b(json.dumps(config, sort_keys=True, default=str).encode(), digest_size=16).hexdigest()
+
+
+def in_progress(name: str, root: Path = CHECKPOINT_DIR, output: Optional[Path] = None) -> bool:
+    """
+    A run for `name` started and has not finished. With `output`, a run whose
+    manifest was last touched before that file was written is stale: the file
+    came from a later run (e.g. the daemon, which trains without checkpoints)
+    and a crashed run's leftover manifest does not hold it back.
+    """
+    path = Path(root) / name / MANIFEST
+    try:
+        manifest = json.loads(path.read_text())
+        if output is not None and Path(output).exists() and path.stat().st_mtime < Path(output).stat().st_mtime:
+            return False
+    except (OSError, ValueError):
+        return False
+    return manifest.get('state') == 'running'
+
+
+class RunCheckpoint:
+    """
+    Stage checkpoints for one training run under models/checkpoints/<name>/.
+    Every stage file is written atomically and recorded in the manifest with
+    its sha256; a stage whose file is missing or fails the hash is treated as
+    never saved. Incremental units (segment fits, trials) go to a JSONL log
+    with a hash per line, so a write torn by a crash only loses that line.
+    A run resumes only when its config digest matches the checkpointed one.
+    """
+
+    def __init__(self, name: str, config: Dict[str, Any], resume: bool = False, root: Path = CHECKPOINT_DIR):
+        self.name = name
+        self.dir = Path(root) / name
+        self.config = config
+        digest = config_digest(config)
+        manifest = self._read_manifest() if resume else None
+        self.resumed = bool(manifest and manifest.get('config_digest') == digest)
+        if not self.resumed:
+            shutil.rmtree(self.dir, ignore_errors=True)
+            manifest = {'model': name, 'config': config, 'config_digest': digest, 'started': _now(), 'stages': {}}
+        manifest['state'] = 'running'
+        self.manifest = manifest
+        self._write_manifest()
+
+    def _read_manifest(self) -> Optional[dict]:
+        try:
+            return json.loads((self.dir / MANIFEST).read_text())
+        except (OSError, ValueError):
+            return None
+
+    def _write_manifest(self) -> None:
+        write_atomic(self.dir / MANIFEST, json.dumps(self.manifest, indent=2).encode())
+
+    def _commit(self, stage: str, filename: str, data: bytes) -> None:
+        path = self.dir / filename
+        write_atomic(path, data)
+        self.manifest['stages'][stage] = {'file': filename, 'sha256': hashlib.sha256(data).hexdigest(), 'saved': _now()}
+        self._write_manifest()
+
+    def _verified(self, stage: str) -> Optional[Path]:
+        entry = self.manifest['stages'].get(stage)
+        if not entry:
+            return None
+        path = self.dir / entry['file']
+        if path.exists() and _sha256(path) == entry['sha256']:
+            return path
+        # Corrupt or missing: forget it so the stage is recomputed
+        self.manifest['stages'].pop(stage, None)
+        self._write_manifest()
+        return None
+
+    def save_arrays(self, stage: str, arrays: Dict[str, np.ndarray]) -> None:
+        buf = io.BytesIO()
+        np.savez(buf, **arrays)
+        self._commit(stage, f'{stage}.npz', buf.getvalue())
+
+    def load_arrays(self, stage: str) -> Optional[Dict[str, np.ndarray]]:
+        path = self._verified(stage)
+        if path is None:
+            return None
+        with np.load(path, allow_pickle=False) as data:
+            return {key: data[key] for key in data.files}
+
+    def save_json(self, stage: str, value: Any) -> None:
+        self._commit(stage, f'{stage}.json', json.dumps(value).encode())
+
+    def load_json(self, stage: str) -> Optional[Any]:
+        path = self._verified(stage)
+        return None if path is None else json.loads(path.read_text())
+
+    def record(self, stage: str, key: str, value: Any) -> None:
+        payload = json.dumps({'key': key, 'value': value}, sort_keys=True)
+        line = json.dumps({'sha256': hashlib.sha256(payload.encode()).hexdigest(), 'entry': payload}) + '\n'
+        self.dir.mkdir(parents=True, exist_ok=True)
+        with open(self.dir / f'{stage}.jsonl', 'a') as fh:
+            fh.write(line)
+            fh.flush()
+            os.fsync(fh.fileno())
+
+    def records(self, stage: str) -> Dict[str, Any]:
+        """Completed units of an incremental stage; stops at the first line that fails its hash."""
+        path = self.dir / f'{stage}.jsonl'
+        done: Dict[str, Any] = {}
+        if not path.exists():
+            return done
+        good = 0
+        with open(path, 'rb') as fh:
+            for raw in fh:
+                try:
+                    line = json.loads(raw)
+                    payload = line['entry']
+                    if hashlib.sha256(payload.encode()).hexdigest() != line['sha256']:
+                        break
+                    entry = json.loads(payload)
+                except (ValueError, KeyError, TypeError):
+                    break
+                done[entry['key']] = entry['value']
+                good += len(raw)
+        if good < path.stat().st_size:
+            # Drop the torn tail so later appends start on a clean line
+            with open(path, 'r+b') as fh:
+                fh.truncate(good)
+        return done
+
+    def finish(self) -> None:
+        """The final output is on disk: checkpoints are no longer needed."""
+        shutil.rmtree(self.dir, ignore_errors=True)
@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_CATEGORICAL = ('mint', 'route', 'source')
+# Unique per row: a dictionary would be as large as the strings, and no trainer reads them
+DEFAULT_SKIP = ('txid',)
+DEFAULT_CHUNK_ROWS = 50_000
+
+
+class CategoryDictionary:
+    """
+    Append-only string -> int32 code mapping. One instance per column name is
+    shared by every dataset in the process, so codes stay comparable.
+    """
+
+    def __init__(self, values: Iterable[str] = ()):
+        self._index: Dict[str, int] = {}
+        self.values: List[str] = []
+        # Sharded reads encode from several threads at once
+        self._lock = threading.Lock()
+        for value in values:
+            self._code(value)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def _code(self, value: str) -> int:
+        code = self._index.get(value)
+        if code is None:
+            code = len(self.values)
+            self._index[value] = code
+            self.values.append(value)
+        return code
+
+    def encode(self, series: pd.Series) -> np.ndarray:
+        inverse, uniques = pd.factorize(series, use_na_sentinel=True)
+        with self._lock:
+            mapping = np.fromiter((self._code(str(u)) for u in uniques), dtype=np.int32, count=len(uniques))
+        codes = np.full(len(inverse), -1, dtype=np.int32)
+        valid = inverse >= 0
+        codes[valid] = mapping[inverse[valid]]
+        return codes
+
+    def lookup(self, value: str) -> int:
+        return self._index.get(value, -1)
+
+
+_DICTIONARIES: Dict[str, CategoryDictionary] = {}
+
+
+def shared_dictionary(name: str) -> CategoryDictionary:
+    dictionary = _DICTIONARIES.get(name)
+    if dictionary is None:
+        dictionary = _DICTIONARIES[name] = CategoryDictionary()
+    return dictionary
+
+
+def adopt_categories(ds: 'CompactDataset', values: Dict[str, Sequence[str]]) -> 'CompactDataset':
+    """
+    Re-key codes produced against another process's dictionaries (given as
+    each dictionary's value list) onto this process's shared dictionaries.
+    """
+    codes = {}
+    for name, column in ds.codes.items():
+        mapping = shared_dictionary(name).encode(pd.Series(list(values[name]), dtype=object))
+        codes[name] = np.where(column >= 0, mapping[np.clip(column, 0, None)], -1).astype(np.int32) if mapping.size else column
+    return CompactDataset(ds.ts, ds.values, ds.columns, codes)
+
+
+def to_epoch_seconds(series: pd.Series) -> np.ndarray:
+    numeric = pd.to_numeric(series, errors='coerce')
+    if len(series) and numeric.notna().all():
+        values = numeric.to_numpy(dtype=np.int64)
+        # Same ms -> s normalisation as the training views
+        return np.where(values > 20_000_000_000, values // 1000, values)
+    parsed = pd.to_datetime(series, utc=True, errors='coerce')
+    seconds = (parsed - pd.Timestamp(0, tz='UTC')) // pd.Timedelta(seconds=1)
+    return seconds.fillna(0).to_numpy(dtype=np.int64)
+
+
+class CompactDataset:
+    """
+    Column-compact training data: a float32 (rows x columns) value block,
+    int32 category codes for string columns and an int64 epoch-second index
+    sorted ascending. Row slices are numpy views, so chronological splits
+    never copy.
+    """
+
+    def __init__(
+        self,
+        ts: np.ndarray,
+        values: np.ndarray,
+        columns: Sequence[str],
+        codes: Optional[Dict[str, np.ndarray]] = None,
+    ):
+        self.ts = ts
+        self.values = values
+        self.columns = list(columns)
+        self.codes = codes or {}
+        self._col_index = {name: i for i, name in enumerate(self.columns)}
+
+    def __len__(self) -> int:
+        return int(self.ts.shape[0])
+
+    @property
+    def empty(self) -> bool:
+        return len(self) == 0
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.ts.nbytes + self.values.nbytes + sum(c.nbytes for c in self.codes.values()))
+
+    def has(self, name: str) -> bool:
+        return name in self._col_index or name in self.codes
+
+    def column(self, name: str) -> Optional[np.ndarray]:
+        idx = self._col_index.get(name)
+        return None if idx is None else self.values[:, idx]
+
+    def categorical(self, name: str) -> pd.Categorical:
+        dictionary = shared_dictionary(name)
+        return pd.Categorical.from_codes(self.codes[name], categories=pd.Index(list(dictionary.values)))
+
+    def rows(self, start: int, stop: Optional[int] = None) -> 'CompactDataset':
+        sl = slice(start, stop)
+        return CompactDataset(self.ts[sl], self.values[sl], self.columns, {k: v[sl] for k, v in self.codes.items()})
+
+    def take(self, index: np.ndarray) -> 'CompactDataset':
+        return CompactDataset(self.ts[index], self.values[index], self.columns, {k: v[index] for k, v in self.codes.items()})
+
+    def split(self, holdout_ratio: float = 0.2, min_rows: int = 5) -> Tuple['CompactDataset', 'CompactDataset']:
+        n = len(self)
+        split = max(min(int(n * (1 - holdout_ratio)), n - 1), 1) if n > min_rows else n
+        return self.rows(0, split), self.rows(split)
+
+    def frame(self, exclude: Iterable[str] = ()) -> pd.DataFrame:
+        """DataFrame over the float32 block (no copy) plus categorical columns."""
+        skip = set(exclude)
+        keep = [i for i, name in enumerate(self.columns) if name not in skip]
+        block = self.values if len(keep) == len(self.columns) else self.values[:, keep]
+        frame = pd.DataFrame(block, columns=[self.columns[i] for i in keep], copy=False)
+        for name in self.codes:
+            if name not in skip:
+                frame[name] = self.categorical(name)
+        return frame
+
+
+def empty_dataset() -> CompactDataset:
+    return CompactDataset(np.empty(0, dtype=np.int64), np.empty((0, 0), dtype=np.float32), [])
+
+
+def concat_datasets(parts: Sequence[CompactDataset]) -> CompactDataset:
+    parts = [p for p in parts if len(p)]
+    if not parts:
+        return empty_dataset()
+    if len(parts) == 1:
+        return parts[0]
+    return CompactDataset(
+        np.concatenate([p.ts for p in parts]),
+        np.concatenate([p.values for p in parts]),
+        parts[0].columns,
+        {name: np.concatenate([p.codes[name] for p in parts]) for name in parts[0].codes},
+    )
+
+
+def sort_by_ts(ds: CompactDataset) -> CompactDataset:
+    if len(ds) > 1 and np.any(ds.ts[1:] < ds.ts[:-1]):
+        return ds.take(np.argsort(ds.ts, kind='stable'))
+    return ds
+
+
+def _compact_chunk(chunk: pd.DataFrame, ts_col: str, categorical: Sequence[str], skip: Sequence[str]) -> CompactDataset:
+    n = len(chunk)
+    ts = to_epoch_seconds(chunk[ts_col]) if ts_col in chunk.columns else np.zeros(n, dtype=np.int64)
+    codes = {name: shared_dictionary(name).encode(chunk[name]) for name in categorical if name in chunk.columns}
+    numeric_cols = [c for c in chunk.columns if c != ts_col and c not in codes and c not in skip]
+    block = np.empty((n, len(numeric_cols)), dtype=np.float32)
+    for i, name in enumerate(numeric_cols):
+        block[:, i] = pd.to_numeric(chunk[name], errors='coerce').to_numpy(dtype=np.float32, na_value=np.nan)
+    return CompactDataset(ts, block, numeric_cols, codes)
+
+
+def iter_compact(
+    conn: sqlite3.Connection,
+    sql: str,
+    params: Tuple = (),
+    ts_col: str = 'ts',
+    categorical: Sequence[str] = DEFAULT_CATEGORICAL,
+    skip: Sequence[str] = DEFAULT_SKIP,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+) -> Iterator[CompactDataset]:
+    """Yield the query as compact chunks in cursor order (not ts-sorted)."""
+    for chunk in pd.read_sql_query(sql, conn, params=params, chunksize=chunk_rows):
+        yield _compact_chunk(chunk, ts_col, categorical, skip)
+
+
+def read_compact(
+    conn: sqlite3.Connection,
+    sql: str,
+    params: Tuple = (),
+    ts_col: str = 'ts',
+    categorical: Sequence[str] = DEFAULT_CATEGORICAL,
+    skip: Sequence[str] = DEFAULT_SKIP,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+) -> CompactDataset:
+    """
+    Stream a query into a CompactDataset chunk by chunk so the full
+    object-dtype DataFrame never materialises. Errors yield an empty dataset.
+    """
+    try:
+        parts = list(iter_compact(conn, sql, params, ts_col, categorical, skip, chunk_rows))
+    except Exception:
+        return empty_dataset()
+    return sort_by_ts(concat_datasets(parts))
+
+
+def compact_frames(
+    frames: Iterable[pd.DataFrame],
+    ts_col: str = 'ts',
+    categorical: Sequence[str] = DEFAULT_CATEGORICAL,
+    skip: Sequence[str] = DEFAULT_SKIP,
+) -> CompactDataset:
+    """Same compaction as read_compact for frames from any other source (e.g. Parquet batches)."""
+    return sort_by_ts(concat_datasets([_compact_chunk(frame, ts_col, categorical, skip) for frame in frames]))
@@ -0,0 +1,267 @@
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from promote_gpu import MODELS
+
+DRIFT_REPORT_PATH = Path('models') / 'drift_report.json'
+DEFAULT_BINS = 20
+DEFAULT_HOURS = 24.0
+# Conventional PSI reading: < 0.1 stable, 0.1-0.2 moderate, > 0.2 shifted
+PSI_THRESHOLD = 0.2
+KS_THRESHOLD = 0.2
+MIN_LIVE_ROWS = 200
+# 20-bin histograms are stable well below this; larger windows are stride-sampled in SQL
+MAX_LIVE_ROWS = 20_000
+PSI_EPS = 1e-4
+DECODE_BATCH_ROWS = 50_000
+# Raw PredictContext keys persisted by executor/fillnet.ts predictFill
+FILL_CTX_KEYS = ('congestionScore', 'lpSol', 'spreadBps', 'volatilityBps', 'ageSec', 'rugProb', 'slippageBps')
+
+
+def _histograms(matrix: np.ndarray, lo: np.ndarray, hi: np.ndarray, bins: int, weights: Optional[np.ndarray] = None) -> np.ndarray:
+    """(features x bins) counts for every column in one bincount; NaN cells are dropped."""
+    n_features = matrix.shape[1]
+    width = np.where(hi > lo, hi - lo, 1.0)
+    idx = np.clip(np.floor((matrix - lo) / width * bins), 0, bins - 1) + np.arange(n_features) * bins
+    valid = ~np.isnan(idx)
+    cell_weights = None if weights is None else np.broadcast_to(weights[:, None], matrix.shape)[valid]
+    counts = np.bincount(idx[valid].astype(np.int64), weights=cell_weights, minlength=n_features * bins)
+    return counts.reshape(n_features, bins).astype(np.float64)
+
+
+def _moments(matrix: np.ndarray, weights: Optional[np.ndarray] = None) -> tuple:
+    valid = ~np.isnan(matrix)
+    w = valid * (1.0 if weights is None else weights[:, None])
+    total = w.sum(axis=0)
+    safe = np.where(total > 0, total, 1.0)
+    filled = np.where(valid, matrix, 0.0)
+    mean = (filled * w).sum(axis=0) / safe
+    var = ((filled - mean) ** 2 * w).sum(axis=0) / safe
+    return mean, np.sqrt(var), total
+
+
+def reference_histograms(
+    matrix: np.ndarray, names: Sequence[str], weights: Optional[np.ndarray] = None, bins: int = DEFAULT_BINS
+) -> dict:
+    """Compact training-distribution summary stored in the model JSON as `drift_reference`."""
+    matrix = np.asarray(matrix, dtype=np.float64)
+    if matrix.shape[0] == 0:
+        return {}
+    w = None if weights is None else np.asarray(weights, dtype=np.float64)
+    lo = np.nan_to_num(np.nanmin(matrix, axis=0))
+    hi = np.nan_to_num(np.nanmax(matrix, axis=0))
+    counts = _histograms(matrix, lo, hi, bins, w)
+    mean, std, _ = _moments(matrix, w)
+    return {
+        'bins': bins,
+        'features': list(names),
+        'lo': lo.round(6).tolist(),
+        'hi': hi.round(6).tolist(),
+        'counts': counts.round(3).tolist(),
+        'mean': mean.round(6).tolist(),
+        'std': std.round(6).tolist(),
+        'rows': int(matrix.shape[0]),
+    }
+
+
+def compare(reference: dict, live: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    PSI, binned KS and standardised mean shift for every feature in one batched
+    pass. A feature that was constant in training (lo == hi) has one bin and no
+    spread to compare against; it is flagged in `monitorable` and scores NaN.
+    """
+    bins = int(reference['bins'])
+    lo = np.asarray(reference['lo'], dtype=np.float64)
+    hi = np.asarray(reference['hi'], dtype=np.float64)
+    monitorable = hi > lo
+    ref_counts = np.asarray(reference['counts'], dtype=np.float64)
+    live_counts = _histograms(live, lo, hi, bins)
+
+    live_rows = live_counts.sum(axis=1)
+    p = ref_counts / np.clip(ref_counts.sum(axis=1, keepdims=True), 1e-12, None)
+    q = live_counts / np.clip(live_rows[:, None], 1e-12, None)
+    p_s = np.clip(p, PSI_EPS, None)
+    q_s = np.clip(q, PSI_EPS, None)
+    psi = ((q_s - p_s) * np.log(q_s / p_s)).sum(axis=1)
+    ks = np.abs(np.cumsum(p, axis=1) - np.cumsum(q, axis=1)).max(axis=1)
+
+    live_mean, _, _ = _moments(live)
+    ref_std = np.asarray(reference['std'], dtype=np.float64)
+    mean_shift = (live_mean - np.asarray(reference['mean'], dtype=np.float64)) / np.clip(ref_std, 1e-6, None)
+    psi[~monitorable] = ks[~monitorable] = mean_shift[~monitorable] = np.nan
+    return {'psi': psi, 'ks': ks, 'mean_shift': mean_shift, 'live_rows': live_rows, 'monitorable': monitorable}
+
+
+def _to_float(values: List) -> np.ndarray:
+    try:
+        return np.array(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        import pandas as pd
+
+        return pd.to_numeric(pd.Series(values, dtype=object), errors='coerce').to_numpy(dtype=np.float64)
+
+
+def _loads(payload: str) -> dict:
+    try:
+        record = json.loads(payload)
+    except ValueError:
+        return {}
+    return record if isinstance(record, dict) else {}
+
+
+def decode_json_columns(payloads: Sequence[str], keys: Sequence[str], nested: Optional[str] = None) -> Dict[str, np.ndarray]:
+    """
+    Decode JSON object rows into float64 columns. Each batch goes through a
+    single json.loads over a joined array; a corrupt row only drops its batch
+    to the per-row path. `nested` unwraps e.g. fill_preds' {"ctx": {...}}.
+    """
+    columns: Dict[str, List[np.ndarray]] = {key: [] for key in keys}
+    for start in range(0, len(payloads), DECODE_BATCH_ROWS):
+        batch = payloads[start:start + DECODE_BATCH_ROWS]
+        try:
+            records = json.loads('[' + ','.join(batch) + ']')
+        except ValueError:
+            records = [_loads(p) for p in batch]
+        if nested:
+            records = [r.get(nested, r) if isinstance(r, dict) else {} for r in records]
+        records = [r if isinstance(r, dict) else {} for r in records]
+        for key in keys:
+            columns[key].append(_to_float([r.get(key) for r in records]))
+    return {key: np.concatenate(parts) if parts else np.empty(0) for key, parts in columns.items()}
+
+
+def _live_alpha(names: Sequence[str], hours: float, max_rows: Optional[int]) -> np.ndarray:
+    from util_ds import get_live_score_features
+
+    columns = decode_json_columns(get_live_score_features(hours, max_rows=max_rows), names)
+    return np.column_stack([columns[name] for name in names]) if names else np.empty((0, 0))
+
+
+def _live_fillnet(names: Sequence[str], hours: float, max_rows: Optional[int]) -> np.ndarray:
+    # Same scaling as training; pandas and the data modules load only when a model is checked
+    import pandas as pd
+
+    from fillnet_train_xgb import build_feature_dataframe
+    from util_ds import get_live_fill_contexts
+
+    columns = decode_json_columns(get_live_fill_contexts(hours, max_rows=max_rows), FILL_CTX_KEYS, nested='ctx')
+    features = build_feature_dataframe(pd.DataFrame(columns))
+    return features[list(names)].to_numpy(dtype=np.float64)
+
+
+# model name -> live feature loader; models without live feature logs are not monitored
+LIVE_SOURCES: Dict[str, Callable[[Sequence[str], float, Optional[int]], np.ndarray]] = {
+    'fillnet': _live_fillnet,
+    'alpha': _live_alpha,
+}
+
+
+def _read_reference(name: str) -> Optional[dict]:
+    path = Path(MODELS[name][1])
+    try:
+        reference = json.loads(path.read_text()).get('drift_reference')
+    except Exception:
+        return None
+    return reference or None
+
+
+def evaluate(
+    name: str,
+    hours: float = DEFAULT_HOURS,
+    psi_threshold: float = PSI_THRESHOLD,
+    ks_threshold: float = KS_THRESHOLD,
+    min_live_rows: int = MIN_LIVE_ROWS,
+    max_live_rows: Optional[int] = MAX_LIVE_ROWS,
+) -> dict:
+    started = time.perf_counter()
+    report = {
+        'model': name,
+        'status': 'ok',
+        'decision': 'skip',
+        'rows_live': 0,
+        'max_psi': 0.0,
+        'max_ks': 0.0,
+        'drifted': [],
+        'missing': [],
+        'unmonitorable': [],
+    }
+    reference = _read_reference(name)
+    if reference is None:
+        # Nothing to compare against: leave the decision to the dataset fingerprint
+        report.update(status='no_reference', decision='retrain')
+        return report
+    names = reference['features']
+    monitorable = np.asarray(reference['hi'], dtype=np.float64) > np.asarray(reference['lo'], dtype=np.float64)
+    report['unmonitorable'] = [feature for i, feature in enumerate(names) if not monitorable[i]]
+    if not monitorable.any():
+        # Every feature was constant in training (e.g. a view without context columns); drift cannot be told
+        report.update(status='unmonitorable', seconds=round(time.perf_counter() - started, 3))
+        return report
+    live = LIVE_SOURCES[name](names, hours, max_live_rows)
+    report['rows_reference'] = reference.get('rows', 0)
+    report['rows_live'] = int(live.shape[0])
+    if live.shape[0] < min_live_rows:
+        # Too few live rows to call it stable either; same as no_reference
+        report.update(status='insufficient_live', decision='retrain')
+    else:
+        scores = compare(reference, live)
+        present = (scores['live_rows'] > 0) & scores['monitorable']
+        drifted = present & ((scores['psi'] >= psi_threshold) | (scores['ks'] >= ks_threshold))
+        report['features'] = {
+            feature: {
+                'psi': round(float(scores['psi'][i]), 4),
+                'ks': round(float(scores['ks'][i]), 4),
+                'mean_shift': round(float(scores['mean_shift'][i]), 4),
+            }
+            for i, feature in enumerate(names)
+            if present[i]
+        }
+        report['max_psi'] = round(float(scores['psi'][present].max(initial=0.0)), 4)
+        report['max_ks'] = round(float(scores['ks'][present].max(initial=0.0)), 4)
+        report['drifted'] = [feature for i, feature in enumerate(names) if drifted[i]]
+        report['missing'] = [feature for i, feature in enumerate(names) if monitorable[i] and not present[i]]
+        report['decision'] = 'retrain' if report['drifted'] else 'skip'
+    report['seconds'] = round(time.perf_counter() - started, 3)
+    return report
+
+
+def evaluate_all(hours: float = DEFAULT_HOURS, **thresholds) -> Dict[str, dict]:
+    reports = {}
+    for name in LIVE_SOURCES:
+        try:
+            reports[name] = evaluate(name, hours, **thresholds)
+        except Exception as exc:
+            reports[name] = {'model': name, 'status': 'error', 'decision': 'retrain', 'error': str(exc)}
+    return reports
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--hours', type=float, default=DEFAULT_HOURS, help='live window to compare against the training reference')
+    parser.add_argument('--psi', type=float, default=PSI_THRESHOLD, help='per-feature PSI that marks a model for retraining')
+    parser.add_argument('--ks', type=float, default=KS_THRESHOLD, help='per-feature binned KS that marks a model for retraining')
+    parser.add_argument('--min-live-rows', type=int, default=MIN_LIVE_ROWS)
+    parser.add_argument('--max-live-rows', type=int, default=MAX_LIVE_ROWS, help='stride-sample larger live windows (0 = read all)')
+    parser.add_argument('--require-drift', action='store_true', help='exit 1 when no model needs a retrain (gates the retrain DAG)')
+    args = parser.parse_args()
+
+    reports = evaluate_all(args.hours, psi_threshold=args.psi, ks_threshold=args.ks, min_live_rows=args.min_live_rows, max_live_rows=args.max_live_rows or None)
+    DRIFT_REPORT_PATH.parent.mkdir(exist_ok=True)
+    DRIFT_REPORT_PATH.write_text(json.dumps(reports, indent=2))
+    for name, report in reports.items():
+        summary = {k: report.get(k) for k in ('status', 'rows_live', 'max_psi', 'max_ks', 'drifted', 'unmonitorable', 'seconds')}
+        print(f"drift: {name}={report['decision']}", json.dumps(summary))
+    if args.require_drift and not any(r['decision'] == 'retrain' for r in reports.values()):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,27 +1,43 @@
+from __future__ import annotations
+
+import argparse
 import json
+import os
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timezone
+from itertools import repeat
 from pathlib import Path
-from typing import Iterable, Tuple
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple
 
 import numpy as np
-import pandas as pd
-from sklearn.linear_model import LogisticRegression, Ridge
-from sklearn.metrics import (
-    brier_score_loss,
-    log_loss,
-    mean_absolute_error,
-    mean_absolute_percentage_error,
-)
 
-from util_ds import get_fillnet_dataset
+from checkpoint import RunCheckpoint
+from shared_arrays import SharedArrays, attach
+
+# pandas and the data/gating modules load inside the functions that use them, so --help stays cheap
+if TYPE_CHECKING:
+    import pandas as pd
 
+    from compact_ds import CompactDataset
+    from reservoir import StratifiedReservoir
+
+OUTPUT_PATH = Path('models') / 'fillnet_v2.json'
 FEATURE_NAMES = ['bias', 'sDepth', 'sCong', 'sSpread', 'sVol', 'sAge', 'sRug', 'sSlipReq']
 DEFAULT_W_FILL = [-3.0, 2.2, 1.5, 0.8, 0.7, 0.2, 0.8, 0.6]
 DEFAULT_W_SLIP = [370.0, -120.0, -80.0, -80.0, -90.0, 0.0, 0.0, 50.0]
 DEFAULT_W_TIME = [2500.0, -700.0, -900.0, -500.0, 0.0, 0.0, 0.0, 0.0]
+# Per-route / per-congestion-bucket fan-out
+MIN_SEGMENT_ROWS = 50
+DEFAULT_PRIOR_ROWS = 500.0
+CONGESTION_EDGES = (0.33, 0.66)
+SEGMENT_METRICS = ('brier', 'slip_mae', 'ttl_mae', 'train_size_fill', 'holdout_size_fill')
+# _fit_heads positional inputs, in order
+SEGMENT_ARRAYS = ('features', 'y_fill', 'y_slip', 'y_ttl', 'weights')
 
 
 def _pick_column(frame: pd.DataFrame, names: Iterable[str], default: float) -> pd.Series:
+    import pandas as pd
+
     for name in names:
         if name in frame.columns:
             series = frame[name]
@@ -31,13 +47,15 @@ def _pick_column(frame: pd.DataFrame, names: Iterable[str], default: float) -> p
 
 
 def build_feature_dataframe(raw: pd.DataFrame) -> pd.DataFrame:
+    import pandas as pd
+
     depth_sol = _pick_column(raw, ['lp_sol', 'lpSol', 'lp_depth_sol'], 0.0)
     congestion = _pick_column(raw, ['congestion_score', 'congestion', 'congestionScore'], 0.5).clip(0.0, 1.0)
     spread_bps = _pick_column(raw, ['spread_bps', 'spreadBps'], 120.0).clip(lower=0.0)
-    volatility_bps = _pick_column(raw, ['volatility_bps', 'volatilityBps'], spread_bps.values).clip(lower=0.0)
+    volatility_bps = _pick_column(raw, ['volatility_bps', 'volatilityBps'], spread_bps).clip(lower=0.0)
     age_sec = _pick_column(raw, ['age_sec', 'ageSec', 'age_seconds'], 300.0).clip(lower=0.0)
     rug_prob = _pick_column(raw, ['rug_prob', 'rugProb', 'rug_probability'], 0.5).clip(0.0, 1.0)
-    slip_req = _pick_column(raw, ['slippage_req_bps', 'slippage_bps_req', 'slippage_bps'], 180.0).clip(lower=1.0)
+    slip_req = _pick_column(raw, ['slippage_req_bps', 'slippage_bps_req', 'slippage_bps', 'slippageBps'], 180.0).clip(lower=1.0)
 
     s_depth = np.clip(depth_sol / 50.0, 0.0, 1.0)
     s_cong = congestion
@@ -59,28 +77,54 @@ def build_feature_dataframe(raw: pd.DataFrame) -> pd.DataFrame:
             'sSlipReq': s_slip_req,
         },
         index=raw.index,
-    ).astype(float)
+    ).astype(np.float32)
     return features
 
 
-def _train_test_split(
-    features: pd.DataFrame,
-    labels: pd.Series,
-    holdout_ratio: float = 0.2,
-) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
-    aligned_labels = labels.reindex(features.index)
-    mask = aligned_labels.notna()
-    feats = features[mask]
-    lbls = aligned_labels[mask]
-    n = len(feats)
-    if n == 0:
-        return np.empty((0, features.shape[1])), np.empty(0), np.empty((0, features.shape[1])), np.empty(0)
-    split = max(min(int(n * (1 - holdout_ratio)), n - 1), 1) if n > 4 else n
-    train = feats.iloc[:split].to_numpy(dtype=float)
-    test = feats.iloc[split:].to_numpy(dtype=float) if split < n else feats.iloc[:0].to_numpy(dtype=float)
-    y_train = lbls.iloc[:split].to_numpy(dtype=float)
-    y_test = lbls.iloc[split:].to_numpy(dtype=float) if split < n else lbls.iloc[:0].to_numpy(dtype=float)
-    return train, y_train, test, y_test
+def _split_index(n: int, holdout_ratio: float = 0.2) -> int:
+    # Rows are ts-sorted, so a single index gives the chronological split for every head
+    return max(min(int(n * (1 - holdout_ratio)), n - 1), 1) if n > 4 else n
+
+
+def _ridge_multi(X: np.ndarray, Y: np.ndarray, w: np.ndarray, alpha: float) -> np.ndarray:
+    """
+    Weighted ridge (unpenalised intercept, same objective as sklearn Ridge)
+    for several targets at once. The Gram matrix is built once; targets with
+    a full mask share one Cholesky factor, NaN rows are subtracted per target.
+    Returns (1 + n_features, n_targets) coefficients, intercept first.
+    """
+    from scipy.linalg import cho_factor, cho_solve
+
+    k = X.shape[1]
+    Xw = X * w[:, None]
+    gram = np.empty((k + 1, k + 1))
+    gram[0, 0] = w.sum()
+    gram[0, 1:] = gram[1:, 0] = Xw.sum(axis=0)
+    gram[1:, 1:] = X.T @ Xw
+    mask = ~np.isnan(Y)
+    Y0 = np.where(mask, Y, 0.0)
+    rhs = np.vstack([w @ Y0, Xw.T @ Y0])
+    penalty = np.diag(np.r_[0.0, np.full(k, alpha)])
+
+    coefs = np.empty((k + 1, Y.shape[1]))
+    full = [t for t in range(Y.shape[1]) if mask[:, t].all()]
+    if full:
+        factor = cho_factor(gram + penalty)
+        coefs[:, full] = cho_solve(factor, rhs[:, full])
+    for t in (t for t in range(Y.shape[1]) if t not in full):
+        drop = ~mask[:, t]
+        Xd, wd = X[drop], w[drop]
+        dropped = np.empty_like(gram)
+        dropped[0, 0] = wd.sum()
+        dropped[0, 1:] = dropped[1:, 0] = wd @ Xd
+        dropped[1:, 1:] = Xd.T @ (Xd * wd[:, None])
+        coefs[:, t] = cho_solve(cho_factor(gram - dropped + penalty), rhs[:, t])
+    return coefs
+
+
+def _label_or_nan(ds: CompactDataset, name: str) -> np.ndarray:
+    column = ds.column(name)
+    return column if column is not None else np.full(len(ds), np.nan, dtype=np.float32)
 
 
 def _has_class_diversity(values: np.ndarray) -> bool:
@@ -88,10 +132,278 @@ def _has_class_diversity(values: np.ndarray) -> bool:
     return unique.size >= 2
 
 
-def train_fillnet() -> dict:
+def _fit_heads(
+    features: np.ndarray,
+    y_fill: np.ndarray,
+    y_slip: np.ndarray,
+    y_ttl: np.ndarray,
+    weights: np.ndarray,
+) -> Dict[str, Any]:
+    # Local so --help and no-data runs never load sklearn
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.metrics import brier_score_loss, log_loss, mean_absolute_error, mean_absolute_percentage_error
+
+    fit: Dict[str, Any] = {
+        'wFill': DEFAULT_W_FILL,
+        'wSlip': DEFAULT_W_SLIP,
+        'wTime': DEFAULT_W_TIME,
+        'metrics': {},
+        'issues': [],
+        'fitted': [],
+    }
+    # One float64 design matrix (bias column dropped) shared by every head; row slices stay C-contiguous
+    design = np.ascontiguousarray(features[:, 1:], dtype=np.float64)
+    w = weights.astype(np.float64)
+    split = _split_index(design.shape[0])
+    X_train, X_holdout = design[:split], design[split:]
+    w_train, w_holdout = w[:split], w[split:]
+    has_holdout = X_holdout.shape[0] > 0
+
+    fill_train, fill_holdout = y_fill[:split], y_fill[split:]
+    fill_mask = ~np.isnan(fill_train)
+    Xf, yf, wf = (X_train, fill_train, w_train) if fill_mask.all() else (X_train[fill_mask], fill_train[fill_mask], w_train[fill_mask])
+    fit['train_size'] = int(yf.size)
+    fit['holdout_size'] = int(np.count_nonzero(~np.isnan(fill_holdout)))
+    fit['metrics']['train_size_fill'] = fit['train_size']
+    fit['metrics']['holdout_size_fill'] = fit['holdout_size']
+
+    if yf.size >= 10 and _has_class_diversity(yf):
+        clf = LogisticRegression(max_iter=1000, C=5.0, solver='lbfgs')
+        clf.fit(Xf, yf, sample_weight=wf)
+        fit['wFill'] = [float(clf.intercept_[0])] + [float(c) for c in clf.coef_[0]]
+        fit['fitted'].append('wFill')
+        preds_train = clf.predict_proba(Xf)[:, 1]
+        logloss = float(log_loss(yf, np.clip(preds_train, 1e-6, 1 - 1e-6), sample_weight=wf, labels=[0, 1]))
+        fit['metrics']['pfill_logloss_train'] = logloss
+        ho_mask = ~np.isnan(fill_holdout)
+        if has_holdout and ho_mask.any():
+            preds_holdout = clf.predict_proba(X_holdout[ho_mask])[:, 1]
+            brier = float(brier_score_loss(fill_holdout[ho_mask], preds_holdout, sample_weight=w_holdout[ho_mask]))
+        else:
+            brier = float(brier_score_loss(yf, preds_train, sample_weight=wf))
+        fit['metrics']['pfill_brier_holdout'] = brier
+        fit['metrics']['brier'] = brier
+    else:
+        fit['issues'].append('insufficient_pfill_data')
+
+    # Both regression heads come out of one Gram matrix / factorisation
+    Y = np.column_stack([y_slip, y_ttl]).astype(np.float64)
+    Y_train, Y_holdout = Y[:split], Y[split:]
+    train_counts = np.count_nonzero(~np.isnan(Y_train), axis=0)
+    holdout_counts = np.count_nonzero(~np.isnan(Y_holdout), axis=0)
+    fit['metrics']['train_size_slip'] = int(train_counts[0])
+    fit['metrics']['holdout_size_slip'] = int(holdout_counts[0])
+    fit['metrics']['train_size_ttl'] = int(train_counts[1])
+    fit['metrics']['holdout_size_ttl'] = int(holdout_counts[1])
+    heads = [t for t in range(2) if train_counts[t] >= 20]
+    # A head whose labels all fall before the shared split would go unscored (and the gate reads
+    # a missing slip_mape as a failure): split that head's own labelled rows instead
+    shared = [t for t in heads if holdout_counts[t] or not has_holdout]
+    fits: Dict[int, Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]] = {}
+    if shared:
+        coefs = _ridge_multi(X_train, Y_train[:, shared], w_train, alpha=5.0)
+        eval_X, eval_Y, eval_w = (X_holdout, Y_holdout, w_holdout) if has_holdout else (X_train, Y_train, w_train)
+        preds = eval_X @ coefs[1:] + coefs[0]
+        for col, t in enumerate(shared):
+            valid = ~np.isnan(eval_Y[:, t])
+            fits[t] = (coefs[:, col], eval_Y[valid, t], preds[valid, col], eval_w[valid])
+    for t in heads:
+        if t in shared:
+            continue
+        rows = np.flatnonzero(~np.isnan(Y[:, t]))
+        cut = _split_index(rows.size)
+        train_rows, holdout_rows = rows[:cut], rows[cut:]
+        coefs = _ridge_multi(design[train_rows], Y[train_rows, t:t + 1], w[train_rows], alpha=5.0)
+        fits[t] = (coefs[:, 0], Y[holdout_rows, t], design[holdout_rows] @ coefs[1:, 0] + coefs[0, 0], w[holdout_rows])
+        head = ('slip', 'ttl')[t]
+        fit['metrics'][f'train_size_{head}'] = int(train_rows.size)
+        fit['metrics'][f'holdout_size_{head}'] = int(holdout_rows.size)
+    for t in heads:
+        coefs_t, truth, pred, wt = fits[t]
+        weights_t = [float(v) for v in coefs_t]
+        if t == 0:
+            fit['wSlip'] = weights_t
+            fit['fitted'].append('wSlip')
+            if truth.size:
+                pred = np.clip(pred, 1, None)
+                fit['metrics']['slip_mae'] = float(mean_absolute_error(truth, pred, sample_weight=wt))
+                fit['metrics']['slip_mape'] = float(
+                    mean_absolute_percentage_error(truth, np.clip(pred, 1e-6, None), sample_weight=wt)
+                )
+        else:
+            fit['wTime'] = weights_t
+            fit['fitted'].append('wTime')
+            if truth.size:
+                fit['metrics']['ttl_mae'] = float(mean_absolute_error(truth, np.clip(pred, 50, None), sample_weight=wt))
+    if 0 not in heads:
+        fit['issues'].append('insufficient_slip_data')
+    if 1 not in heads:
+        fit['issues'].append('insufficient_ttl_data')
+    return fit
+
+
+def _segment_rows(arrays: Dict[str, np.ndarray], code: int, bucket: Optional[int]) -> np.ndarray:
+    mask = arrays['route'] == code
+    if bucket is not None:
+        mask &= arrays['bucket'] == bucket
+    return np.flatnonzero(mask)
+
+
+def _fit_segment(
+    key: Tuple[str, Optional[int]],
+    code: int,
+    arrays: Dict[str, np.ndarray],
+) -> Tuple[Tuple[str, Optional[int]], Dict[str, Any]]:
+    idx = _segment_rows(arrays, code, key[1])
+    return key, _fit_heads(*(arrays[name][idx] for name in SEGMENT_ARRAYS))
+
+
+def _fit_shared_segment(key: Tuple[str, Optional[int]], code: int, descriptor: dict) -> Tuple[Tuple[str, Optional[int]], Dict[str, Any]]:
+    # Tasks carry only the segment key; rows are gathered from the shared store in the worker
+    return _fit_segment(key, code, attach(descriptor))
+
+
+def _checkpointed(fits: Iterable[Tuple[Tuple[str, Optional[int]], Dict[str, Any]]], checkpoint: Optional[RunCheckpoint]) -> Iterable:
+    for key, fit in fits:
+        if checkpoint is not None:
+            checkpoint.record('segments', json.dumps(list(key)), fit)
+        yield key, fit
+
+
+def _save_sample(checkpoint: RunCheckpoint, ds: CompactDataset, weights: np.ndarray, sampling: Dict[str, Any]) -> None:
+    from compact_ds import shared_dictionary
+
+    arrays = {
+        'ts': ds.ts,
+        'values': ds.values,
+        'columns': np.array(ds.columns, dtype=str),
+        'weights': weights,
+        'sampling': np.array(json.dumps(sampling)),
+    }
+    for name, codes in ds.codes.items():
+        arrays[f'codes__{name}'] = codes
+        # Codes are only meaningful against this process's dictionary, so it travels along
+        arrays[f'dictionary__{name}'] = np.array(list(shared_dictionary(name).values), dtype=str)
+    checkpoint.save_arrays('sample', arrays)
+
+
+def _load_sample(checkpoint: RunCheckpoint) -> Optional[Tuple[CompactDataset, np.ndarray, Dict[str, Any]]]:
+    from compact_ds import CompactDataset, adopt_categories
+
+    arrays = checkpoint.load_arrays('sample')
+    if arrays is None:
+        return None
+    names = [key.split('__', 1)[1] for key in arrays if key.startswith('codes__')]
+    ds = CompactDataset(arrays['ts'], arrays['values'], arrays['columns'].tolist(), {name: arrays[f'codes__{name}'] for name in names})
+    ds = adopt_categories(ds, {name: arrays[f'dictionary__{name}'].tolist() for name in names})
+    return ds, arrays['weights'], json.loads(str(arrays['sampling']))
+
+
+def _shrink(fit: Dict[str, Any], parent: Dict[str, Any], prior_rows: float) -> Dict[str, Any]:
+    # Credibility weighting: a segment with n training rows keeps n / (n + prior_rows) of its own weights
+    n = float(fit.get('train_size', 0))
+    alpha = n / (n + prior_rows) if prior_rows > 0 else 1.0
+    shrunk: Dict[str, Any] = {'train_size': int(n), 'holdout_size': int(fit.get('holdout_size', 0)), 'shrinkage': round(1.0 - alpha, 4)}
+    for head in ('wFill', 'wSlip', 'wTime'):
+        own = np.asarray(fit[head], dtype=float)
+        base = np.asarray(parent[head], dtype=float)
+        shrunk[head] = [float(v) for v in (alpha * own + (1.0 - alpha) * base)] if head in fit['fitted'] else list(parent[head])
+    shrunk['metrics'] = {k: v for k, v in fit['metrics'].items() if k in SEGMENT_METRICS}
+    return shrunk
+
+
+def _segment_models(
+    ds: CompactDataset,
+    features: np.ndarray,
+    labels: Tuple[np.ndarray, np.ndarray, np.ndarray],
+    weights: np.ndarray,
+    global_fit: Dict[str, Any],
+    by_congestion: bool,
+    prior_rows: float,
+    jobs: int,
+    checkpoint: Optional[RunCheckpoint] = None,
+) -> Dict[str, Any]:
+    from compact_ds import shared_dictionary
+
+    route_codes = ds.codes.get('route')
+    if route_codes is None:
+        return {}
+    route_names = shared_dictionary('route').values
+    cong_bucket = np.searchsorted(CONGESTION_EDGES, features[:, 2], side='right')
+
+    arrays = dict(zip(SEGMENT_ARRAYS, (features, *labels, weights)), route=route_codes, bucket=cong_bucket)
+    n_buckets = len(CONGESTION_EDGES) + 1
+    tasks: List[Tuple[Tuple[str, Optional[int]], int]] = []
+    for code in np.unique(route_codes[route_codes >= 0]).tolist():
+        route_buckets = np.bincount(cong_bucket[route_codes == code], minlength=n_buckets)
+        if int(route_buckets.sum()) < MIN_SEGMENT_ROWS:
+            continue
+        route = route_names[code]
+        tasks.append(((route, None), code))
+        if by_congestion:
+            tasks += [((route, b), code) for b in range(n_buckets) if route_buckets[b] >= MIN_SEGMENT_ROWS]
+
+    # Segment fits finished before a crash are replayed from the checkpoint log
+    order = [key for key, _ in tasks]
+    fits: Dict[Tuple[str, Optional[int]], Dict[str, Any]] = {}
+    if checkpoint is not None:
+        fits = {tuple(json.loads(key)): fit for key, fit in checkpoint.records('segments').items()}
+        tasks = [task for task in tasks if task[0] not in fits]
+
+    if jobs > 1 and len(tasks) > 1:
+        # Published once; workers map the same pages instead of unpickling a copy per task
+        with SharedArrays(arrays) as store, ProcessPoolExecutor(max_workers=min(jobs, len(tasks))) as pool:
+            done = pool.map(_fit_shared_segment, *zip(*tasks), repeat(store.descriptor))
+            fits.update(_checkpointed(done, checkpoint))
+    else:
+        fits.update(_checkpointed((_fit_segment(key, code, arrays) for key, code in tasks), checkpoint))
+    fits = {key: fits[key] for key in order}
+
+    routes: Dict[str, Any] = {}
+    for (route, bucket), fit in fits.items():
+        if bucket is None:
+            routes[route] = _shrink(fit, global_fit, prior_rows)
+    for (route, bucket), fit in fits.items():
+        if bucket is not None and route in routes:
+            routes[route].setdefault('congestion', {})[str(bucket)] = _shrink(fit, routes[route], prior_rows)
+    return routes
+
+
+def train_fillnet(
+    force: bool = False,
+    reservoir: Optional[StratifiedReservoir] = None,
+    per_route: bool = True,
+    by_congestion: bool = False,
+    prior_rows: float = DEFAULT_PRIOR_ROWS,
+    jobs: int = 1,
+    sample: Optional[Tuple[CompactDataset, np.ndarray]] = None,
+    checkpoint: Optional[RunCheckpoint] = None,
+) -> Optional[dict]:
+    from drift import reference_histograms
+    from fingerprint import compact_fingerprint, dataset_fingerprint, read_model, unchanged
+    from reservoir import StratifiedReservoir
+    from util_ds import get_fillnet_sample
+
+    # `sample` lets a caller holding the window in memory (trainer_daemon) skip the DB read
+    reservoir = reservoir or StratifiedReservoir('y_fill')
+    restored = _load_sample(checkpoint) if checkpoint is not None and sample is None else None
+    if restored is not None:
+        ds, weights, sampling = restored
+    else:
+        ds, weights = sample if sample is not None else get_fillnet_sample(days=21, reservoir=reservoir)
+        sampling = {**reservoir.summary(), 'caps': reservoir.caps, 'source_weights': reservoir.source_weights}
+        if checkpoint is not None:
+            _save_sample(checkpoint, ds, weights, sampling)
+    segmentation = {'per_route': per_route, 'by_congestion': by_congestion, 'prior_rows': prior_rows}
+    fingerprint = dataset_fingerprint(
+        {**compact_fingerprint(ds), 'sampling': sampling, 'segmentation': segmentation}, __file__
+    )
+    if not force and unchanged(read_model(OUTPUT_PATH), fingerprint):
+        return None
+
     result = {
         'version': 2,
-        'created': datetime.now(timezone.utc).isoformat(timespec='seconds').replace('+00:00', 'Z'),
+        'created': datetime.now(timezone.utc).isoformat(timespec='milliseconds').replace('+00:00', 'Z'),
         'status': 'ok',
         'features': FEATURE_NAMES,
         'metrics': {},
@@ -100,82 +412,93 @@ def train_fillnet() -> dict:
         'wTime': DEFAULT_W_TIME,
         'train_size': 0,
         'holdout_size': 0,
+        'sampling': sampling,
+        'fingerprint': fingerprint,
     }
 
-    raw_X, y_fill, y_slip, y_ttl, _ = get_fillnet_dataset(days=21)
-    if raw_X.empty or y_fill.empty:
+    y_fill = ds.column('y_fill')
+    if ds.empty or y_fill is None:
         result['status'] = 'no_data'
         return result
 
-    feature_df = build_feature_dataframe(raw_X)
-    X_train_fill, y_train_fill, X_holdout_fill, y_holdout_fill = _train_test_split(feature_df, y_fill)
-    result['train_size'] = int(y_train_fill.size)
-    result['holdout_size'] = int(y_holdout_fill.size)
-    result['metrics']['train_size_fill'] = int(y_train_fill.size)
-    result['metrics']['holdout_size_fill'] = int(y_holdout_fill.size)
-
-    issues = []
-    if y_train_fill.size >= 10 and _has_class_diversity(y_train_fill):
-        clf = LogisticRegression(max_iter=1000, C=5.0, solver='lbfgs')
-        clf.fit(X_train_fill[:, 1:], y_train_fill)
-        w_fill = [float(clf.intercept_[0])] + [float(c) for c in clf.coef_[0]]
-        result['wFill'] = w_fill
-        preds_train = clf.predict_proba(X_train_fill[:, 1:])[:, 1]
-        logloss = float(log_loss(y_train_fill, np.clip(preds_train, 1e-6, 1 - 1e-6)))
-        result['metrics']['pfill_logloss_train'] = logloss
-        holdout_src = X_holdout_fill[:, 1:] if y_holdout_fill.size > 0 else X_train_fill[:, 1:]
-        holdout_y = y_holdout_fill if y_holdout_fill.size > 0 else y_train_fill
-        preds_holdout = clf.predict_proba(holdout_src)[:, 1]
-        brier = float(brier_score_loss(holdout_y, preds_holdout))
-        result['metrics']['pfill_brier_holdout'] = brier
-        result['metrics']['brier'] = brier
-    else:
-        issues.append('insufficient_pfill_data')
-
-    X_train_slip, y_train_slip, X_holdout_slip, y_holdout_slip = _train_test_split(feature_df, y_slip.dropna())
-    result['metrics']['train_size_slip'] = int(y_train_slip.size)
-    result['metrics']['holdout_size_slip'] = int(y_holdout_slip.size)
-    if y_train_slip.size >= 20:
-        reg_slip = Ridge(alpha=5.0)
-        reg_slip.fit(X_train_slip[:, 1:], y_train_slip)
-        w_slip = [float(reg_slip.intercept_)] + [float(c) for c in reg_slip.coef_]
-        result['wSlip'] = w_slip
-        preds_slip = reg_slip.predict(X_holdout_slip[:, 1:]) if y_holdout_slip.size > 0 else reg_slip.predict(X_train_slip[:, 1:])
-        truth_slip = y_holdout_slip if y_holdout_slip.size > 0 else y_train_slip
-        preds_slip = np.clip(preds_slip, 1, None)
-        result['metrics']['slip_mae'] = float(mean_absolute_error(truth_slip, preds_slip))
-        result['metrics']['slip_mape'] = float(mean_absolute_percentage_error(truth_slip, np.clip(preds_slip, 1e-6, None)))
+    cached = checkpoint.load_arrays('features') if checkpoint is not None else None
+    if cached is not None and cached['features'].shape[0] == len(ds):
+        features = cached['features']
     else:
-        issues.append('insufficient_slip_data')
-
-    X_train_ttl, y_train_ttl, X_holdout_ttl, y_holdout_ttl = _train_test_split(feature_df, y_ttl.dropna())
-    result['metrics']['train_size_ttl'] = int(y_train_ttl.size)
-    result['metrics']['holdout_size_ttl'] = int(y_holdout_ttl.size)
-    if y_train_ttl.size >= 20:
-        reg_ttl = Ridge(alpha=5.0)
-        reg_ttl.fit(X_train_ttl[:, 1:], y_train_ttl)
-        w_time = [float(reg_ttl.intercept_)] + [float(c) for c in reg_ttl.coef_]
-        result['wTime'] = w_time
-        preds_ttl = reg_ttl.predict(X_holdout_ttl[:, 1:]) if y_holdout_ttl.size > 0 else reg_ttl.predict(X_train_ttl[:, 1:])
-        truth_ttl = y_holdout_ttl if y_holdout_ttl.size > 0 else y_train_ttl
-        preds_ttl = np.clip(preds_ttl, 50, None)
-        result['metrics']['ttl_mae'] = float(mean_absolute_error(truth_ttl, preds_ttl))
-    else:
-        issues.append('insufficient_ttl_data')
+        features = build_feature_dataframe(ds.frame()).to_numpy(dtype=np.float32)
+        if checkpoint is not None:
+            checkpoint.save_arrays('features', {'features': features})
+    labels = (y_fill, _label_or_nan(ds, 'y_slip_bps'), _label_or_nan(ds, 'y_ttl_ms'))
+    global_fit = checkpoint.load_json('global_fit') if checkpoint is not None else None
+    if global_fit is None:
+        global_fit = _fit_heads(features, *labels, weights)
+        if checkpoint is not None:
+            checkpoint.save_json('global_fit', global_fit)
+    for key in ('wFill', 'wSlip', 'wTime', 'metrics', 'train_size', 'holdout_size'):
+        result[key] = global_fit[key]
+    result['drift_reference'] = reference_histograms(features[:, 1:], FEATURE_NAMES[1:], weights)
+
+    if per_route:
+        # Keyed by route; the executor falls back to the top-level (global) weights for unknown routes
+        result['routes'] = _segment_models(ds, features, labels, weights, global_fit, by_congestion, prior_rows, jobs, checkpoint)
+        if by_congestion:
+            result['congestion_edges'] = list(CONGESTION_EDGES)
 
-    if issues:
+    if global_fit['issues']:
         result['status'] = 'insufficient_data'
-        result['issues'] = issues
+        result['issues'] = global_fit['issues']
 
     return result
 
 
 def main() -> None:
-    out_dir = Path('models')
-    out_dir.mkdir(exist_ok=True)
-    result = train_fillnet()
-    (out_dir / 'fillnet_v2.json').write_text(json.dumps(result, indent=2))
-    print('fillnet:', result['status'], json.dumps(result.get('metrics', {})))
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--force', action='store_true', help='retrain even if the dataset fingerprint is unchanged')
+    parser.add_argument('--cap-real', type=int, help='max rows kept per real (source, route, fill) stratum (default: reservoir.DEFAULT_CAPS)')
+    parser.add_argument('--cap-sim', type=int, help='max rows kept per sim (source, route, fill) stratum (default: reservoir.DEFAULT_CAPS)')
+    parser.add_argument('--sim-weight', type=float, help='sample_weight multiplier for sim rows; 1 restores the raw sim-heavy mix (default: reservoir.DEFAULT_SOURCE_WEIGHTS)')
+    parser.add_argument('--no-per-route', action='store_true', help='fit only the global model')
+    parser.add_argument('--by-congestion', action='store_true', help='also fit per (route, congestion bucket) models')
+    parser.add_argument('--prior-rows', type=float, default=DEFAULT_PRIOR_ROWS, help='shrinkage strength toward the parent model, in rows')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1, help='worker processes for per-route fits')
+    parser.add_argument('--resume', action='store_true', help='continue from the last consistent checkpoint of an interrupted run')
+    args = parser.parse_args()
+    from fingerprint import write_model
+    from promote_gpu import snapshot_production
+    from reservoir import DEFAULT_CAPS, DEFAULT_SOURCE_WEIGHTS, StratifiedReservoir
+
+    args.cap_real = DEFAULT_CAPS['real'] if args.cap_real is None else args.cap_real
+    args.cap_sim = DEFAULT_CAPS['sim'] if args.cap_sim is None else args.cap_sim
+    args.sim_weight = DEFAULT_SOURCE_WEIGHTS['sim'] if args.sim_weight is None else args.sim_weight
+    reservoir = StratifiedReservoir(
+        'y_fill',
+        caps={'real': args.cap_real, 'sim': args.cap_sim},
+        source_weights={'sim': args.sim_weight},
+    )
+    OUTPUT_PATH.parent.mkdir(exist_ok=True)
+    # Resuming is only consistent under the same sampling/segmentation settings
+    config = {k: v for k, v in vars(args).items() if k not in ('force', 'jobs', 'resume')}
+    checkpoint = RunCheckpoint('fillnet', config, resume=args.resume)
+    if checkpoint.resumed:
+        print('fillnet: resuming', json.dumps(sorted(checkpoint.manifest['stages'])))
+    result = train_fillnet(
+        force=args.force,
+        reservoir=reservoir,
+        per_route=not args.no_per_route,
+        by_congestion=args.by_congestion,
+        prior_rows=args.prior_rows,
+        jobs=max(1, args.jobs),
+        checkpoint=checkpoint,
+    )
+    if result is None:
+        checkpoint.finish()
+        print('fillnet: unchanged (fingerprint match, use --force to retrain)')
+        return
+    # The candidate is written over the served model; keep that as the gate's rollback source
+    snapshot_production('fillnet')
+    write_model(OUTPUT_PATH, result)
+    checkpoint.finish()
+    print('fillnet:', result['status'], json.dumps(result.get('metrics', {})), f"routes={len(result.get('routes', {}))}")
 
 
 if __name__ == '__main__':
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from checkpoint import write_atomic
+from compact_ds import CompactDataset, shared_dictionary
+
+_HERE = Path(__file__).resolve().parent
+_SHARED_SOURCES = (_HERE / 'util_ds.py', _HERE / 'compact_ds.py', _HERE / 'fingerprint.py')
+_TS_COLUMNS = ('ts', 'entry_ts')
+
+
+def _max_ts(df: pd.DataFrame) -> Optional[Any]:
+    for col in _TS_COLUMNS:
+        if col in df.columns:
+            values = pd.to_numeric(df[col], errors='coerce')
+            if values.notna().any():
+                return float(values.max())
+            if df[col].notna().any():
+                return str(df[col].dropna().astype(str).max())
+    return None
+
+
+def frame_fingerprint(df: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Cheap content fingerprint of a raw training frame: row count, max ts and a
+    hash over every column (labels and features) in column order.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(json.dumps([str(c) for c in df.columns]).encode())
+    if not df.empty:
+        hashed = pd.util.hash_pandas_object(df, index=False).to_numpy(dtype=np.uint64)
+        digest.update(hashed.tobytes())
+    return {
+        'rows': int(len(df)),
+        'max_ts': _max_ts(df),
+        'data_hash': digest.hexdigest(),
+    }
+
+
+def compact_fingerprint(ds: CompactDataset) -> Dict[str, Any]:
+    """Same contract as frame_fingerprint, hashed straight off the compact arrays."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(json.dumps([*ds.columns, *sorted(ds.codes)]).encode())
+    digest.update(np.ascontiguousarray(ds.ts).tobytes())
+    digest.update(np.ascontiguousarray(ds.values).tobytes())
+    for name in sorted(ds.codes):
+        # Hash decoded strings rather than codes: codes depend on dictionary insertion order
+        entries = pd.util.hash_array(np.asarray(shared_dictionary(name).values, dtype=object))
+        codes = ds.codes[name]
+        row_hashes = np.zeros(codes.shape[0], dtype=np.uint64)
+        valid = codes >= 0
+        row_hashes[valid] = entries[codes[valid]]
+        digest.update(row_hashes.tobytes())
+    return {
+        'rows': len(ds),
+        'max_ts': int(ds.ts.max()) if len(ds) else None,
+        'data_hash': digest.hexdigest(),
+    }
+
+
+def code_version(*paths: str) -> str:
+    digest = hashlib.blake2b(digest_size=8)
+    for path in [*(Path(p).resolve() for p in paths), *_SHARED_SOURCES]:
+        try:
+            digest.update(path.read_bytes())
+        except OSError:
+            digest.update(str(path).encode())
+    return digest.hexdigest()
+
+
+def dataset_fingerprint(frame_fp: Optional[Dict[str, Any]], *sources: str) -> Dict[str, Any]:
+    fp = dict(frame_fp or frame_fingerprint(pd.DataFrame()))
+    fp['code_version'] = code_version(*sources)
+    payload = json.dumps({k: fp[k] for k in sorted(fp) if k != 'digest'}, sort_keys=True)
+    fp['digest'] = hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+    return fp
+
+
+def read_model(path: Path) -> Optional[dict]:
+    if not path.exists():
+        return None
+    try:
+        return json.loads(path.read_text())
+    except Exception:
+        return None
+
+
+def write_model(path: Path, result: dict) -> None:
+    # Candidates are read by promote_gpu and (for fillnet) served in place; never leave a torn file
+    write_atomic(Path(path), json.dumps(result, indent=2).encode())
+
+
+def unchanged(previous: Optional[dict], fingerprint: Dict[str, Any]) -> bool:
+    if not previous:
+        return False
+    prev_fp = previous.get('fingerprint') or {}
+    return bool(prev_fp.get('digest')) and prev_fp.get('digest') == fingerprint.get('digest')
@@ -1,12 +1,13 @@
 import os, sys
-import numpy as np
-import xgboost as xgb
 
 
 def prefer_gpu():
     if os.getenv('FORCE_CPU') == '1': return False
     if os.getenv('FORCE_GPU') == '1': return True
     try:
+        # Deferred: FORCE_* answers without loading xgboost, and a missing install means CPU
+        import numpy as np
+        import xgboost as xgb
         # XGBoost 3.x: device='cuda', tree_method='hist'
         dtrain = xgb.DMatrix(np.random.randn(256, 8), label=(np.random.rand(256) > 0.5).astype(np.float32))
         params = dict(objective='binary:logistic', device='cuda', tree_method='hist', max_depth=2, eta=0.3,
@@ -0,0 +1,248 @@
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from fillnet_train_xgb import FEATURE_NAMES, OUTPUT_PATH, build_feature_dataframe
+
+PARITY_REPORT_PATH = Path('models') / 'parity_report.json'
+OUTPUTS = ('p_fill', 'exp_slip_bps', 'exp_time_ms')
+HEADS = ('wFill', 'wSlip', 'wTime')
+FEATURE_TOLERANCE = 1e-5
+# Training features are float32; slip/time are rounded ints on the serving side
+OUTPUT_TOLERANCE = {'p_fill': 1e-4, 'exp_slip_bps': 1.0, 'exp_time_ms': 1.0}
+DEFAULT_MAX_MISMATCH_RATE = 0.001
+# PredictContext key each feature is scaled from (FEATURE_NAMES order, bias excluded)
+FEATURE_CTX_KEYS = ('lpSol', 'congestionScore', 'spreadBps', 'volatilityBps', 'ageSec', 'rugProb', 'slippageBps')
+
+
+class _Deviation:
+    """Streaming mismatch count / max / mean absolute deviation for one quantity."""
+
+    def __init__(self, tolerance: float):
+        self.tolerance = tolerance
+        self.rows = 0
+        self.mismatches = 0
+        self.max_abs = 0.0
+        self.sum_abs = 0.0
+
+    def add(self, expected: np.ndarray, actual: np.ndarray) -> np.ndarray:
+        diff = np.abs(expected - actual)
+        # NaN on either side counts as a mismatch
+        diff = np.where(np.isnan(diff), np.inf, diff)
+        bad = diff > self.tolerance
+        finite = diff[np.isfinite(diff)]
+        self.rows += diff.size
+        self.mismatches += int(bad.sum())
+        if finite.size:
+            self.max_abs = max(self.max_abs, float(finite.max()))
+            self.sum_abs += float(finite.sum())
+        return bad
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            'rows': self.rows,
+            'mismatch_rate': round(self.mismatches / self.rows, 6) if self.rows else 0.0,
+            'max_abs_diff': round(self.max_abs, 6),
+            'mean_abs_diff': round(self.sum_abs / self.rows, 6) if self.rows else 0.0,
+        }
+
+
+def serving_features(ctx: Dict[str, np.ndarray]) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """
+    Vectorised mirror of executor/fillnet.ts predictFill scaling, including its
+    defaults for missing context fields. Returns (rows x 8 features, raw inputs
+    the heuristic fallback needs).
+    """
+    cong = np.where(np.isnan(ctx['congestionScore']), 0.5, ctx['congestionScore'])
+    depth = np.maximum(0.0, np.nan_to_num(ctx['lpSol'], nan=0.0))
+    spread = np.maximum(0.0, np.nan_to_num(ctx['spreadBps'], nan=0.0))
+    vol = np.maximum(0.0, np.where(np.isnan(ctx['volatilityBps']), spread, ctx['volatilityBps']))
+    age = np.maximum(0.0, np.nan_to_num(ctx['ageSec'], nan=0.0))
+    rug = np.clip(np.where(np.isnan(ctx['rugProb']), 0.5, ctx['rugProb']), 0.0, 1.0)
+    # Math.max(1, undefined) is NaN in JS, so a missing slippageBps stays NaN here too
+    slip_req = np.maximum(1.0, ctx['slippageBps'])
+    features = np.column_stack([
+        np.ones_like(cong),
+        np.minimum(1.0, depth / 50.0),
+        cong,
+        1.0 - np.minimum(1.0, spread / 200.0),
+        1.0 - np.minimum(1.0, vol / 300.0),
+        np.minimum(1.0, age / 600.0),
+        1.0 - rug,
+        np.minimum(1.0, slip_req / 300.0),
+    ])
+    return features, {'spread': spread, 'vol': vol}
+
+
+def training_features(ctx: Dict[str, np.ndarray]) -> np.ndarray:
+    import pandas as pd
+
+    return build_feature_dataframe(pd.DataFrame(ctx)).to_numpy(dtype=np.float64)
+
+
+class _WeightTable:
+    """
+    Flattened predictFill selectWeights: every (route, congestion bucket) weight
+    set becomes one segment so a batch is scored as X @ W.T and then gathered.
+    """
+
+    def __init__(self, model: dict):
+        self.edges = np.asarray(model.get('congestion_edges') or [], dtype=np.float64)
+        segments: List[dict] = [model]
+        self.route_index: Dict[str, int] = {}
+        self.bucket_index: Dict[Tuple[str, int], int] = {}
+        for route, route_model in (model.get('routes') or {}).items():
+            self.route_index[route] = len(segments)
+            segments.append(route_model)
+            if self.edges.size:
+                for bucket, bucket_model in (route_model.get('congestion') or {}).items():
+                    self.bucket_index[(route, int(bucket))] = len(segments)
+                    segments.append(bucket_model)
+        self.weights = {}
+        self.valid = {}
+        for head in HEADS:
+            rows = [seg.get(head) for seg in segments]
+            ok = np.array([isinstance(w, list) and len(w) == len(FEATURE_NAMES) for w in rows])
+            self.weights[head] = np.array([w if good else [0.0] * len(FEATURE_NAMES) for w, good in zip(rows, ok)], dtype=np.float64)
+            self.valid[head] = ok
+
+    def segments(self, routes: Sequence[str], s_cong: np.ndarray) -> np.ndarray:
+        route_seg = np.fromiter((self.route_index.get(r, 0) for r in routes), dtype=np.int64, count=len(routes))
+        if not self.bucket_index:
+            return route_seg
+        buckets = (s_cong[:, None] >= self.edges[None, :]).sum(axis=1)
+        return np.fromiter(
+            (self.bucket_index.get((r, int(b)), seg) for r, b, seg in zip(routes, buckets, route_seg)),
+            dtype=np.int64,
+            count=len(routes),
+        )
+
+    def score(self, features: np.ndarray, segments: np.ndarray, raw: Dict[str, np.ndarray]) -> np.ndarray:
+        rows = np.arange(features.shape[0])
+        z = {head: (features @ self.weights[head].T)[rows, segments] for head in HEADS}
+        valid = {head: self.valid[head][segments] for head in HEADS}
+
+        s_depth, s_cong, s_spread, s_vol, s_age, s_rug, s_slip = features[:, 1:].T
+        spread, vol = raw['spread'], raw['vol']
+        fallback_fill = 1.0 / (1.0 + np.exp(-(2.2 * s_depth + 1.5 * s_cong + 0.8 * s_spread + 0.7 * s_vol + 0.2 * s_age + 0.8 * s_rug + 0.6 * s_slip - 3.0)))
+        fallback_slip = np.maximum(5.0, _js_round(spread * 0.4 + vol * 0.3 + (1 - s_depth) * 120 + (1 - s_cong) * 80))
+        fallback_time = np.maximum(200.0, _js_round(400 + (1 - s_cong) * 900 + (1 - s_depth) * 700 + (spread / 200) * 500))
+
+        p_fill = np.where(valid['wFill'], 1.0 / (1.0 + np.exp(-z['wFill'])), fallback_fill)
+        slip = np.where(valid['wSlip'], np.maximum(1.0, _js_round(z['wSlip'])), fallback_slip)
+        time_ms = np.where(valid['wTime'], np.maximum(50.0, _js_round(z['wTime'])), fallback_time)
+        return np.column_stack([p_fill, slip, time_ms])
+
+
+def _js_round(values: np.ndarray) -> np.ndarray:
+    # Math.round rounds halves up; np.round rounds them to even
+    return np.floor(values + 0.5)
+
+
+def _created_ms(model: dict) -> int:
+    import pandas as pd
+
+    created = model.get('created')
+    if not created:
+        return 0
+    parsed = pd.Timestamp(created)
+    parsed = parsed.tz_localize('UTC') if parsed.tzinfo is None else parsed
+    return int(parsed.timestamp() * 1000)
+
+
+def check_parity(
+    model_path: Path = OUTPUT_PATH,
+    days: float = 7.0,
+    since_created: bool = True,
+    batch_rows: int = 50_000,
+) -> dict:
+    from drift import FILL_CTX_KEYS, decode_json_columns
+    from util_ds import iter_fill_predictions
+
+    model = json.loads(Path(model_path).read_text())
+    table = _WeightTable(model)
+    since_ms = int((datetime.now(timezone.utc) - timedelta(days=days)).timestamp() * 1000)
+    if since_created:
+        # Older rows were produced by whichever model was live before this one
+        since_ms = max(since_ms, _created_ms(model))
+
+    features = {name: _Deviation(FEATURE_TOLERANCE) for name in FEATURE_NAMES[1:]}
+    missing = {key: 0 for key in FILL_CTX_KEYS}
+    paths = {path: {name: _Deviation(OUTPUT_TOLERANCE[name]) for name in OUTPUTS} for path in ('serving_path', 'training_path')}
+    routes: Dict[str, Dict[str, int]] = {}
+    rows = 0
+
+    for ts, route_names, logged, payloads in iter_fill_predictions(since_ms, batch_rows):
+        ctx = decode_json_columns(payloads, FILL_CTX_KEYS, nested='ctx')
+        for key in FILL_CTX_KEYS:
+            missing[key] += int(np.isnan(ctx[key]).sum())
+        served, raw = serving_features(ctx)
+        trained = training_features(ctx)
+        for i, name in enumerate(FEATURE_NAMES[1:], start=1):
+            features[name].add(trained[:, i], served[:, i])
+
+        any_bad = np.zeros(len(ts), dtype=bool)
+        for path, X in (('serving_path', served), ('training_path', trained)):
+            rescored = table.score(X, table.segments(route_names, X[:, 2]), raw)
+            for j, name in enumerate(OUTPUTS):
+                bad = paths[path][name].add(rescored[:, j], logged[:, j])
+                if path == 'training_path':
+                    any_bad |= bad
+
+        route_codes, inverse = np.unique(np.asarray(route_names, dtype=object), return_inverse=True)
+        route_rows = np.bincount(inverse, minlength=route_codes.size)
+        route_bad = np.bincount(inverse, weights=any_bad, minlength=route_codes.size)
+        for route, n, bad in zip(route_codes.tolist(), route_rows.tolist(), route_bad.tolist()):
+            stats = routes.setdefault(route, {'rows': 0, 'mismatches': 0})
+            stats['rows'] += n
+            stats['mismatches'] += int(bad)
+        rows += len(ts)
+
+    return {
+        'model': str(model_path),
+        'created': model.get('created'),
+        'since_ms': since_ms,
+        'rows': rows,
+        'features': {
+            name: {**dev.summary(), 'ctx_missing_rate': round(missing[key] / rows, 6) if rows else 0.0}
+            for (name, dev), key in zip(features.items(), FEATURE_CTX_KEYS)
+        },
+        'outputs': {path: {name: dev.summary() for name, dev in devs.items()} for path, devs in paths.items()},
+        'routes': {
+            route: {**stats, 'mismatch_rate': round(stats['mismatches'] / stats['rows'], 6)}
+            for route, stats in sorted(routes.items())
+        },
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model', default=str(OUTPUT_PATH), help='fillnet model JSON to rescore with')
+    parser.add_argument('--days', type=float, default=7.0, help='how far back to read fill_preds')
+    parser.add_argument('--all-rows', action='store_true', help='include predictions logged before the model was created')
+    parser.add_argument('--batch-rows', type=int, default=50_000)
+    parser.add_argument('--max-mismatch-rate', type=float, default=DEFAULT_MAX_MISMATCH_RATE, help='exit 1 above this training-path mismatch rate')
+    args = parser.parse_args()
+
+    report = check_parity(Path(args.model), args.days, since_created=not args.all_rows, batch_rows=args.batch_rows)
+    PARITY_REPORT_PATH.parent.mkdir(exist_ok=True)
+    PARITY_REPORT_PATH.write_text(json.dumps(report, indent=2))
+    print('parity: rows', report['rows'])
+    for path, outputs in report['outputs'].items():
+        print(f'parity: {path}', json.dumps({name: s['mismatch_rate'] for name, s in outputs.items()}))
+    skewed = {name: s['max_abs_diff'] for name, s in report['features'].items() if s['mismatch_rate'] > 0}
+    print('parity: feature_skew', json.dumps(skewed))
+    worst = max((s['mismatch_rate'] for s in report['outputs']['training_path'].values()), default=0.0)
+    if worst > args.max_mismatch_rate:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import datetime as dt
+import os
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import pyarrow as pa
+import pyarrow.dataset as pads
+import pyarrow.parquet as pq
+
+from compact_ds import DEFAULT_CATEGORICAL, DEFAULT_CHUNK_ROWS, CompactDataset, compact_frames, empty_dataset
+
+# Backtest-only data source (util_ds BACKTEST_DATA_BACKEND=parquet): the exports carry candidates and
+# trades but not exec_outcomes, so none of the training views can be rebuilt from them.
+# Same env key as persistence.parquetDir, so a synced export directory needs no extra config
+PARQUET_DIR = os.environ.get('PARQUET_OUTPUT_DIR', './data/parquet')
+PARQUET_THREADS = int(os.environ.get('TRAINING_PARQUET_THREADS', str(os.cpu_count() or 1)))
+# Export prefix (packages/persistence/src/parquet.ts) -> ISO timestamp column rows are windowed on
+EXPORT_TS_COLUMNS: Dict[str, str] = {
+    'candidates': 'createdAt',
+    'trades': 'createdAt',
+    'policy_actions': 'createdAt',
+    'topics': 'createdAt',
+    'topic_windows': 'openedAt',
+    'topic_matches': 'matchedAt',
+}
+# Files rotate on write time while rows carry the caller's timestamp; allow some lag past a file's window
+FILE_SLACK = dt.timedelta(hours=1)
+_FILE_TS = re.compile(r'_(\d{4}-\d{2}-\d{2}T\d{2}-\d{2}-\d{2}(?:\.\d+)?Z)\.parquet$')
+
+
+_ARROW_CONFIGURED = False
+
+
+def _configure_arrow() -> None:
+    # Arrow's pools are process-wide: size them once from TRAINING_PARQUET_THREADS, not per read
+    global _ARROW_CONFIGURED
+    if not _ARROW_CONFIGURED:
+        pa.set_cpu_count(max(1, PARQUET_THREADS))
+        pa.set_io_thread_count(max(1, PARQUET_THREADS))
+        _ARROW_CONFIGURED = True
+
+
+def _iso_ms(ts: dt.datetime) -> str:
+    # Date.toISOString() layout, so string bounds compare exactly against createdAt
+    return ts.astimezone(dt.timezone.utc).replace(tzinfo=None).isoformat(timespec='milliseconds') + 'Z'
+
+
+def window_bounds(days: float) -> Tuple[str, str]:
+    now = dt.datetime.now(dt.timezone.utc)
+    return _iso_ms(now - dt.timedelta(days=days)), _iso_ms(now)
+
+
+def _file_start(path: Path) -> Optional[dt.datetime]:
+    match = _FILE_TS.search(path.name)
+    if not match:
+        return None
+    date, time = match.group(1)[:-1].split('T')
+    return dt.datetime.fromisoformat(f"{date}T{time[:8].replace('-', ':')}{time[8:]}").replace(tzinfo=dt.timezone.utc)
+
+
+def export_files(table: str, start: str, end: str, root: str = PARQUET_DIR) -> List[str]:
+    """
+    Export files of `table` that can hold rows in [start, end). Each file covers
+    its rotation window up to the next file's start, so whole files outside the
+    range are skipped before any footer is read.
+    """
+    pattern = re.compile(rf'^{re.escape(table)}_\d{{4}}-')
+    stamped = sorted(
+        (started, path)
+        for path in Path(root).glob(f'{table}_*.parquet')
+        if pattern.match(path.name) and (started := _file_start(path)) is not None
+    )
+    lo = dt.datetime.fromisoformat(start.replace('Z', '+00:00')) - FILE_SLACK
+    hi = dt.datetime.fromisoformat(end.replace('Z', '+00:00')) + FILE_SLACK
+    keep = []
+    for i, (started, path) in enumerate(stamped):
+        next_start = stamped[i + 1][0] if i + 1 < len(stamped) else None
+        if started < hi and (next_start is None or next_start > lo):
+            keep.append(str(path))
+    return keep
+
+
+def _projection(schema: pa.Schema, ts_col: str, columns: Optional[Sequence[str]], categorical: Sequence[str]) -> List[str]:
+    if columns is not None:
+        wanted = [ts_col, *columns]
+    else:
+        # Free-text columns would only decode to NaN in the float block
+        wanted = [ts_col] + [
+            f.name for f in schema
+            if f.name in categorical or pa.types.is_integer(f.type) or pa.types.is_floating(f.type) or pa.types.is_boolean(f.type)
+        ]
+    return [name for name in dict.fromkeys(wanted) if name in schema.names]
+
+
+def read_export(
+    table: str,
+    days: float = 14,
+    columns: Optional[Sequence[str]] = None,
+    categorical: Sequence[str] = DEFAULT_CATEGORICAL,
+    bounds: Optional[Tuple[str, str]] = None,
+    threads: Optional[int] = None,
+    root: str = PARQUET_DIR,
+) -> CompactDataset:
+    """
+    Read one export table over a half-open ISO window as a CompactDataset.
+    Only `columns` (plus the timestamp) are decoded; the window filter is
+    pushed down so row groups whose min/max timestamps fall outside it are
+    skipped. Row groups decode on Arrow's shared pool (TRAINING_PARQUET_THREADS);
+    threads=1 scans serially.
+    """
+    ts_col = EXPORT_TS_COLUMNS[table]
+    start, end = bounds or window_bounds(days)
+    files = export_files(table, start, end, root)
+    if not files:
+        return empty_dataset()
+    threads = PARQUET_THREADS if threads is None else threads
+    _configure_arrow()
+    # Optional columns were added over time; unify so older partitions read as nulls
+    schema = pa.unify_schemas([pq.read_schema(path) for path in files])
+    dataset = pads.dataset(files, schema=schema, format='parquet')
+    field = pads.field(ts_col)
+    scanner = dataset.scanner(
+        columns=_projection(schema, ts_col, columns, categorical),
+        filter=(field >= start) & (field < end),
+        batch_size=DEFAULT_CHUNK_ROWS,
+        use_threads=threads > 1,
+    )
+    frames = (batch.to_pandas() for batch in scanner.to_batches() if batch.num_rows)
+    return compact_frames(frames, ts_col=ts_col, categorical=categorical)
@@ -1,10 +1,15 @@
+import argparse
+import asyncio
 import json
 import os
+import random
 import shutil
 import subprocess
+import time
 from datetime import datetime, timedelta
 from pathlib import Path
 from urllib import error as urlerror, request as urlrequest
+from urllib.parse import urlsplit, urlunsplit
 
 
 MODELS = {
@@ -15,6 +20,9 @@ MODELS = {
     'survival': ('models/survival_v1.json', 'models/survival.json', None),
 }
 
+# Candidate fingerprints that already went through backtest/OPE, keyed by model name
+PROMOTE_STATE_PATH = 'models/promote_state.json'
+
 DEFAULT_RELOAD_ENDPOINTS = {
     'fillnet': 'http://127.0.0.1:4011/control/reload-models',
     'alpha': 'http://127.0.0.1:4021/control/reload-models',
@@ -58,20 +66,194 @@ def backtest_and_ope(env_overrides: dict) -> dict:
     return summary
 
 
-def trigger_reload(name: str) -> str:
-    default = DEFAULT_RELOAD_ENDPOINTS.get(name, '')
-    url = os.environ.get(f'PROMOTE_{name.upper()}_RELOAD_URL', default)
-    if not url:
-        return 'skipped(no_url)'
+# Gauge each service sets from the loaded model's `created` (unix seconds, ms precision); unlisted models are not verified
+MODEL_VERSION_GAUGES = {
+    'fillnet': 'fillnet_model_epoch_seconds',
+    'alpha': 'alpha_model_epoch_seconds',
+}
+# Half a millisecond: float gauges round-trip `created` exactly to the millisecond
+CREATED_TOLERANCE_SEC = 5e-4
+# Last artifact that passed reload verification, used as the rollback source
+PROMOTED_DIR = 'models/promoted'
+RELOAD_ATTEMPTS = 3
+RELOAD_BACKOFF_SEC = 0.5
+RELOAD_TIMEOUT_SEC = 5.0
+VERIFY_TIMEOUT_SEC = float(os.environ.get('PROMOTE_VERIFY_TIMEOUT_SEC', '30'))
+VERIFY_POLL_SEC = 1.0
+
+
+def _env_list(key: str, default: str = '') -> list[str]:
+    return [item.strip() for item in os.environ.get(key, default).split(',') if item.strip()]
+
+
+def reload_endpoints(name: str) -> list[tuple[str, str]]:
+    """
+    (reload_url, metrics_url) pairs. PROMOTE_<NAME>_RELOAD_URL takes a comma
+    separated list; metrics URLs default to /metrics on the same host:port and
+    can be overridden positionally via PROMOTE_<NAME>_METRICS_URL.
+    """
+    reloads = _env_list(f'PROMOTE_{name.upper()}_RELOAD_URL', DEFAULT_RELOAD_ENDPOINTS.get(name, ''))
+    metrics = _env_list(f'PROMOTE_{name.upper()}_METRICS_URL')
+    pairs = []
+    for i, url in enumerate(reloads):
+        parts = urlsplit(url)
+        default_metrics = urlunsplit((parts.scheme, parts.netloc, '/metrics', '', ''))
+        pairs.append((url, metrics[i] if i < len(metrics) else default_metrics))
+    return pairs
+
+
+def _http(url: str, method: str) -> tuple[int, str]:
+    req = urlrequest.Request(url, data=b'' if method == 'POST' else None, method=method)
+    with urlrequest.urlopen(req, timeout=RELOAD_TIMEOUT_SEC) as resp:
+        return resp.getcode(), resp.read().decode('utf-8', errors='replace')
+
+
+def _gauge_value(text: str, gauge: str) -> float | None:
+    for line in text.splitlines():
+        if line.startswith(gauge) and line[len(gauge):len(gauge) + 1] in (' ', '{'):
+            try:
+                return float(line.rsplit(' ', 1)[1])
+            except ValueError:
+                return None
+    return None
+
+
+async def _post_with_retries(url: str) -> tuple[str, int]:
+    status = 'failed'
+    for attempt in range(1, RELOAD_ATTEMPTS + 1):
+        try:
+            code, _ = await asyncio.to_thread(_http, url, 'POST')
+            if 200 <= code < 300:
+                return f'ok({code})', attempt
+            status = f'http_{code}'
+        except urlerror.HTTPError as exc:
+            status = f'http_{exc.code}'
+        except Exception as exc:
+            status = f'failed:{exc}'
+        if attempt < RELOAD_ATTEMPTS:
+            # Full jitter so several services restarting together do not retry in lockstep
+            await asyncio.sleep(random.uniform(0, RELOAD_BACKOFF_SEC * 2 ** (attempt - 1)))
+    return status, RELOAD_ATTEMPTS
+
+
+async def _reload_one(name: str, reload_url: str, metrics_url: str, expected: float | None) -> dict:
+    started = time.perf_counter()
+    status, attempts = await _post_with_retries(reload_url)
+    result = {
+        'endpoint': reload_url,
+        'reload': status,
+        'attempts': attempts,
+        'reload_ms': round((time.perf_counter() - started) * 1000, 1),
+        'verified': None,
+    }
+    gauge = MODEL_VERSION_GAUGES.get(name)
+    if not status.startswith('ok') or gauge is None or expected is None:
+        result['verified'] = False if not status.startswith('ok') else None
+        return result
+    deadline = time.perf_counter() + VERIFY_TIMEOUT_SEC
+    observed = None
+    while True:
+        try:
+            _, text = await asyncio.to_thread(_http, metrics_url, 'GET')
+            observed = _gauge_value(text, gauge)
+        except Exception:
+            observed = None
+        if observed is not None and abs(observed - expected) < CREATED_TOLERANCE_SEC:
+            result['verified'] = True
+            break
+        if time.perf_counter() >= deadline:
+            result['verified'] = False
+            break
+        await asyncio.sleep(VERIFY_POLL_SEC)
+    result['observed'] = observed
+    result['expected'] = expected
+    result['verify_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    return result
+
+
+def _created_epoch(artifact: dict | None) -> float | None:
+    created = (artifact or {}).get('created')
+    if not created:
+        return None
     try:
-        req = urlrequest.Request(url, data=b'', method='POST')
-        with urlrequest.urlopen(req, timeout=5) as resp:
-            code = resp.getcode()
-            return f'ok({code})' if 200 <= code < 300 else f'http_{code}'
-    except urlerror.URLError as exc:
-        return f'failed:{exc}'
-    except Exception as exc:  # pragma: no cover - unexpected errors
-        return f'failed:{exc}'
+        return datetime.fromisoformat(str(created).replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return None
+
+
+async def _fan_out(name: str, expected: float | None) -> list[dict]:
+    endpoints = reload_endpoints(name)
+    return list(await asyncio.gather(*(_reload_one(name, r, m, expected) for r, m in endpoints)))
+
+
+def trigger_reload(name: str, artifact: dict | None = None) -> tuple[bool, str, list[dict]]:
+    """
+    Notify every reload endpoint for `name` concurrently, then poll each
+    service's /metrics until its model-version gauge equals the artifact's
+    `created`. Returns (all verified or unverifiable, summary, per-endpoint results).
+    """
+    if not reload_endpoints(name):
+        return True, 'skipped(no_url)', []
+    results = asyncio.run(_fan_out(name, _created_epoch(artifact)))
+    ok = all(r['verified'] is not False for r in results)
+    summary = ','.join(
+        f"{urlsplit(r['endpoint']).netloc}:{r['reload']}"
+        + ('' if r['verified'] is None else f":{'verified' if r['verified'] else 'mismatch'}")
+        + f":{r.get('verify_ms', r['reload_ms'])}ms"
+        for r in results
+    )
+    return ok, summary, results
+
+
+def _archive_promoted(name: str, cand_path: str) -> None:
+    try:
+        Path(PROMOTED_DIR).mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(cand_path, Path(PROMOTED_DIR) / f'{name}.json')
+    except Exception:
+        pass
+
+
+def _same_file(a: str, b: str) -> bool:
+    return Path(a).resolve() == Path(b).resolve()
+
+
+def snapshot_production(name: str) -> None:
+    """
+    Archive the serving artifact as the rollback source before a trainer
+    overwrites it. Where candidate and production share a path (fillnet) the
+    previous model is otherwise gone by the time the gate runs. An existing
+    archive is already the last verified artifact and is kept.
+    """
+    cand_path, prod_primary, _ = MODELS[name]
+    archived = Path(PROMOTED_DIR) / f'{name}.json'
+    if archived.exists() or not _same_file(cand_path, prod_primary) or not Path(prod_primary).exists():
+        return
+    try:
+        archived.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(prod_primary, archived)
+    except Exception:
+        pass
+
+
+def rollback(name: str, prod_primary: str, prod_alias: str | None, previous: bytes | None) -> str:
+    """Restore the last verified artifact (or the pre-promotion production file) and reload it."""
+    archived = Path(PROMOTED_DIR) / f'{name}.json'
+    source = archived.read_bytes() if archived.exists() else previous
+    rejected = Path(prod_primary).read_bytes() if Path(prod_primary).exists() else None
+    if not source or source == rejected:
+        return 'unavailable'
+    try:
+        # Candidate and production share a path for some models; keep the rejected artifact for inspection
+        Path(PROMOTED_DIR).mkdir(parents=True, exist_ok=True)
+        if rejected:
+            (Path(PROMOTED_DIR) / f'{name}.rejected.json').write_bytes(rejected)
+        for path in (prod_primary, prod_alias):
+            if path:
+                Path(path).write_bytes(source)
+    except Exception as e:
+        return f'failed:{e}'
+    ok, summary, _ = trigger_reload(name, json.loads(source))
+    return f"{'ok' if ok else 'unverified'}({summary})"
 
 
 def read_json(path: str) -> dict | None:
@@ -84,6 +266,22 @@ def read_json(path: str) -> dict | None:
         return None
 
 
+def candidate_digest(cand: dict | None) -> str | None:
+    return ((cand or {}).get('fingerprint') or {}).get('digest')
+
+
+def record_evaluated(name: str, digest: str | None, outcome: str) -> None:
+    if not digest:
+        return
+    state = read_json(PROMOTE_STATE_PATH) or {}
+    state[name] = {'digest': digest, 'outcome': outcome, 'ts': datetime.utcnow().isoformat(timespec='seconds') + 'Z'}
+    try:
+        from checkpoint import write_atomic
+        write_atomic(Path(PROMOTE_STATE_PATH), json.dumps(state, indent=2).encode())
+    except Exception:
+        pass
+
+
 def gate_fillnet(current: dict | None, cand: dict | None) -> tuple[bool, str]:
     if not cand:
         return False, 'candidate_missing'
@@ -126,7 +324,17 @@ def gate_alpha(current: dict | None, cand: dict | None) -> tuple[bool, str]:
     precision60 = metrics.get('precision_at_50_60m')
     if precision60 is not None and precision60 < 0.5:
         return False, f'precision_60m_too_low({precision60})'
-    return True, f'auc_10m={auc10:.3f}'
+    # Replay both models over recent closed trades; imported lazily, the backtest pulls in pandas
+    from backtest_vec import alpha_promotion_check
+
+    try:
+        backtest_ok, backtest_reason = alpha_promotion_check(current, cand)
+    except Exception as exc:
+        # Fail closed: a candidate is never promoted without the replay check
+        return False, f'vec_backtest_error({exc})'
+    if not backtest_ok:
+        return False, backtest_reason
+    return True, f'auc_10m={auc10:.3f},{backtest_reason}'
 
 
 def gate_rug(current: dict | None, cand: dict | None) -> tuple[bool, str]:
@@ -160,9 +368,19 @@ def gate_survival(current: dict | None, cand: dict | None) -> tuple[bool, str]:
     return True, f'sample_size={sample_size}'
 
 
-def maybe_promote(name: str, prod_primary: str, cand_path: str, env_keys: dict, prod_alias: str | None = None) -> str:
+def maybe_promote(name: str, prod_primary: str, cand_path: str, env_keys: dict, prod_alias: str | None = None, force: bool = False) -> str:
+    from checkpoint import in_progress
+
+    # A run still writing this model's candidate; a crashed run's manifest older than the candidate is ignored
+    if in_progress(name, output=Path(cand_path)):
+        return f"PROMOTE {name}=skipped reason=run_in_progress(resume with --resume or rerun)"
     cur = read_json(prod_primary)
     cand = read_json(cand_path)
+    # Same dataset + trainer code as the last evaluated candidate: nothing new to gate or backtest
+    digest = candidate_digest(cand)
+    last = (read_json(PROMOTE_STATE_PATH) or {}).get(name) or {}
+    if not force and digest and last.get('digest') == digest:
+        return f"PROMOTE {name}=skipped reason=unchanged_fingerprint({last.get('outcome')})"
     gate_fn = {
         'fillnet': gate_fillnet,
         'alpha': gate_alpha,
@@ -171,38 +389,56 @@ def maybe_promote(name: str, prod_primary: str, cand_path: str, env_keys: dict,
     }[name]
     ok, reason = gate_fn(cur, cand)
     if not ok:
+        # A backtest error may be transient; only settled rejections are remembered
+        if not reason.startswith('vec_backtest_error'):
+            record_evaluated(name, digest, 'gate_failed')
         return f"PROMOTE {name}=skipped reason={reason}"
     # Backtest/OPE with candidate envs
     env_overrides = {k: v for k, v in env_keys.items() if v}
     bt = backtest_and_ope(env_overrides)
     if not (bt['backtest_ok'] and bt['ope_ok']):
+        record_evaluated(name, digest, 'bt_or_ope_failed')
         return f"PROMOTE {name}=skipped reason=bt_or_ope_failed"
-    # Promote
+    # Promote; a production file that is the candidate itself is no rollback source (see snapshot_production)
+    in_place = _same_file(cand_path, prod_primary)
+    previous = Path(prod_primary).read_bytes() if Path(prod_primary).exists() and not in_place else None
     try:
-        shutil.copyfile(cand_path, prod_primary)
-        if prod_alias:
-            shutil.copyfile(cand_path, prod_alias)
-        reload_status = trigger_reload(name)
-        return f"PROMOTE {name}=ok reason={reason} reload={reload_status}"
+        for path in (prod_primary, prod_alias):
+            if path and not _same_file(cand_path, path):
+                shutil.copyfile(cand_path, path)
     except Exception as e:
         return f"PROMOTE {name}=skipped reason=copy_failed:{e}"
+    verified, reload_status, _ = trigger_reload(name, cand)
+    if not verified:
+        restored = rollback(name, prod_primary, prod_alias, previous)
+        record_evaluated(name, digest, 'rolled_back')
+        return f"PROMOTE {name}=rolled_back reason=reload_mismatch reload={reload_status} rollback={restored}"
+    _archive_promoted(name, cand_path)
+    record_evaluated(name, digest, 'promoted')
+    return f"PROMOTE {name}=ok reason={reason} reload={reload_status}"
+
+
+# Map env overrides for each model, if supported by services/backtest
+MODEL_ENV_KEYS = {
+    'fillnet': 'FILLNET_MODEL_PATH',
+    'alpha': 'ALPHA_MODEL_PATH',
+    'rugguard': 'RUGGUARD_MODEL_PATH',
+    'survival': 'SURVIVAL_MODEL_PATH',
+}
+
+
+def promote(name: str, force: bool = False) -> str:
+    cand_path, prod_primary, prod_alias = MODELS[name]
+    env_keys = {MODEL_ENV_KEYS[name]: str(Path(cand_path).resolve())}
+    return maybe_promote(name, prod_primary, cand_path, env_keys, prod_alias, force=force)
 
 
 def main() -> None:
-    # Map env overrides for each model, if supported by services/backtest
-    envs = {
-        'fillnet': {'FILLNET_MODEL_PATH': str(Path('models/fillnet_v2.json').resolve())},
-        'alpha': {'ALPHA_MODEL_PATH': str(Path('models/alpha_ranker_v1.json').resolve())},
-        'rugguard': {'RUGGUARD_MODEL_PATH': str(Path('models/rugguard_v2.json').resolve())},
-        'survival': {'SURVIVAL_MODEL_PATH': str(Path('models/survival_v1.json').resolve())},
-    }
-    lines = []
-    lines.append(maybe_promote('fillnet', MODELS['fillnet'][1], MODELS['fillnet'][0], envs['fillnet'], MODELS['fillnet'][2]))
-    lines.append(maybe_promote('alpha', MODELS['alpha'][1], MODELS['alpha'][0], envs['alpha'], MODELS['alpha'][2]))
-    lines.append(maybe_promote('rugguard', MODELS['rugguard'][1], MODELS['rugguard'][0], envs['rugguard'], MODELS['rugguard'][2]))
-    lines.append(maybe_promote('survival', MODELS['survival'][1], MODELS['survival'][0], envs['survival'], MODELS['survival'][2]))
-    for ln in lines:
-        print(ln)
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--force', action='store_true', help='backtest/OPE candidates even if their fingerprint was already evaluated')
+    args = parser.parse_args()
+    for name in ('fillnet', 'alpha', 'rugguard', 'survival'):
+        print(promote(name, force=args.force))
 
 
 if __name__ == '__main__':
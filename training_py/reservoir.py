@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from compact_ds import CompactDataset, concat_datasets, empty_dataset, shared_dictionary
+
+# Per-stratum caps keyed by fill_training_view.source; real fills are rare and kept nearly in full
+DEFAULT_CAPS = {'real': 250_000, 'sim': 20_000}
+DEFAULT_CAP = 20_000
+# sample_weight multiplier per source; sim outnumbers real fills about 10:1, so 0.1 brings the weighted mix near even
+DEFAULT_SOURCE_WEIGHTS = {'sim': 0.1}
+# Buffered candidates are folded into the pool once they outnumber it (or this many rows)
+MIN_COMPACT_ROWS = 100_000
+
+
+class StratifiedReservoir:
+    """
+    One-pass stratified reservoir over compact chunks. Strata are
+    (source, route, label); each keeps at most cap[source] rows chosen
+    uniformly via bottom-k random keys. A full stratum's k-th smallest key is
+    the bar a new row must beat, so most rows of a long stream are dropped on
+    arrival; the survivors are buffered and merged into the pool only once
+    they outnumber it, which keeps the cost per row amortised constant and
+    memory bounded by about twice the caps plus one chunk.
+    """
+
+    def __init__(
+        self,
+        label: str,
+        caps: Optional[Dict[str, int]] = None,
+        default_cap: int = DEFAULT_CAP,
+        source_weights: Optional[Dict[str, float]] = None,
+        seed: int = 0,
+    ):
+        self.label = label
+        self.caps = dict(DEFAULT_CAPS if caps is None else caps)
+        self.default_cap = default_cap
+        self.source_weights = dict(DEFAULT_SOURCE_WEIGHTS if source_weights is None else source_weights)
+        self._rng = np.random.default_rng(seed)
+        self._kept = empty_dataset()
+        self._keys = np.empty(0, dtype=np.float64)
+        self._strata = np.empty(0, dtype=np.int64)
+        self._seen: Dict[int, int] = {}
+        self.rows_seen = 0
+        # Sorted full strata and their current admission key (stale bars only admit extra rows)
+        self._full_strata = np.empty(0, dtype=np.int64)
+        self._full_keys = np.empty(0, dtype=np.float64)
+        self._pending: List[Tuple[CompactDataset, np.ndarray, np.ndarray]] = []
+        self._pending_rows = 0
+
+    @staticmethod
+    def _codes(ds: CompactDataset, name: str) -> np.ndarray:
+        codes = ds.codes.get(name)
+        return codes.astype(np.int64) if codes is not None else np.full(len(ds), -1, dtype=np.int64)
+
+    def _strata_of(self, ds: CompactDataset) -> np.ndarray:
+        label = ds.column(self.label)
+        label_bin = np.zeros(len(ds), dtype=np.int64) if label is None else (np.nan_to_num(label) > 0.5).astype(np.int64)
+        source = self._codes(ds, 'source') + 1
+        route = self._codes(ds, 'route') + 1
+        return (source << 40) | (route << 1) | label_bin
+
+    def _source_name(self, stratum: np.ndarray) -> np.ndarray:
+        names = np.asarray(['unknown', *shared_dictionary('source').values], dtype=object)
+        return names[stratum >> 40]
+
+    def _cap_of(self, strata: np.ndarray) -> np.ndarray:
+        names = self._source_name(strata)
+        return np.fromiter((self.caps.get(n, self.default_cap) for n in names), dtype=np.int64, count=strata.size)
+
+    def empty_like(self, seed: int) -> 'StratifiedReservoir':
+        return StratifiedReservoir(self.label, self.caps, self.default_cap, self.source_weights, seed)
+
+    def _keep(self, pool: CompactDataset, keys: np.ndarray, all_strata: np.ndarray) -> None:
+        order = np.lexsort((keys, all_strata))
+        sorted_strata = all_strata[order]
+        starts = np.flatnonzero(np.r_[True, sorted_strata[1:] != sorted_strata[:-1]])
+        lengths = np.diff(np.r_[starts, sorted_strata.size])
+        rank = np.arange(sorted_strata.size) - np.repeat(starts, lengths)
+        stratum_caps = self._cap_of(sorted_strata[starts])
+        keep = np.sort(order[rank < np.repeat(stratum_caps, lengths)])
+
+        self._kept = pool.take(keep)
+        self._keys = keys[keep]
+        self._strata = all_strata[keep]
+        full = lengths >= stratum_caps
+        self._full_strata = sorted_strata[starts[full]]
+        self._full_keys = keys[order[starts[full] + stratum_caps[full] - 1]]
+
+    def _admitted(self, keys: np.ndarray, strata: np.ndarray) -> np.ndarray:
+        if self._full_strata.size == 0:
+            return np.ones(keys.size, dtype=bool)
+        pos = np.minimum(np.searchsorted(self._full_strata, strata), self._full_strata.size - 1)
+        return (self._full_strata[pos] != strata) | (keys < self._full_keys[pos])
+
+    def _compact(self) -> None:
+        if not self._pending:
+            return
+        parts, self._pending, self._pending_rows = self._pending, [], 0
+        self._keep(
+            concat_datasets([self._kept, *(ds for ds, _, _ in parts)]),
+            np.concatenate([self._keys, *(keys for _, keys, _ in parts)]),
+            np.concatenate([self._strata, *(strata for _, _, strata in parts)]),
+        )
+
+    def add(self, chunk: CompactDataset) -> None:
+        if len(chunk) == 0:
+            return
+        strata = self._strata_of(chunk)
+        uniq, counts = np.unique(strata, return_counts=True)
+        for stratum, count in zip(uniq.tolist(), counts.tolist()):
+            self._seen[stratum] = self._seen.get(stratum, 0) + count
+        self.rows_seen += len(chunk)
+        keys = self._rng.random(len(chunk))
+        admit = self._admitted(keys, strata)
+        if not admit.any():
+            return
+        if admit.all():
+            self._pending.append((chunk, keys, strata))
+        else:
+            self._pending.append((chunk.take(np.flatnonzero(admit)), keys[admit], strata[admit]))
+        self._pending_rows += int(admit.sum())
+        if self._pending_rows >= max(len(self._kept), MIN_COMPACT_ROWS):
+            self._compact()
+
+    def merge(self, other: 'StratifiedReservoir') -> None:
+        """
+        Fold in a reservoir filled from a disjoint slice of the stream. Keys are
+        uniform, so the bottom-k of the union is a valid sample of the union.
+        Both sides must share this process's category dictionaries.
+        """
+        for stratum, count in other._seen.items():
+            self._seen[stratum] = self._seen.get(stratum, 0) + count
+        self.rows_seen += other.rows_seen
+        self._compact()
+        other._compact()
+        if len(other._kept):
+            self._keep(
+                concat_datasets([self._kept, other._kept]),
+                np.concatenate([self._keys, other._keys]),
+                np.concatenate([self._strata, other._strata]),
+            )
+
+    def result(self) -> Tuple[CompactDataset, np.ndarray]:
+        """
+        Returns (sample sorted by ts, float32 importance weights). Weights are
+        seen/kept per stratum times the source weight, normalised to mean 1 so
+        regularisation strength is unchanged. seen/kept undoes the caps, so on
+        its own the weighted sample would stand for the raw sim-heavy stream;
+        the source weights (DEFAULT_SOURCE_WEIGHTS, --sim-weight) are what
+        down-weight sim. Pass source_weights={} for raw-mix parity.
+        """
+        self._compact()
+        if len(self._kept) == 0:
+            return empty_dataset(), np.empty(0, dtype=np.float32)
+        uniq, inverse, kept_counts = np.unique(self._strata, return_inverse=True, return_counts=True)
+        seen = np.fromiter((self._seen[s] for s in uniq.tolist()), dtype=np.float64, count=uniq.size)
+        factor = np.fromiter(
+            (self.source_weights.get(n, 1.0) for n in self._source_name(uniq)), dtype=np.float64, count=uniq.size
+        )
+        weights = (seen / kept_counts * factor)[inverse]
+        weights = weights / weights.mean()
+        order = np.argsort(self._kept.ts, kind='stable')
+        return self._kept.take(order), weights[order].astype(np.float32)
+
+    def summary(self) -> Dict[str, int]:
+        self._compact()
+        return {'rows_seen': int(self.rows_seen), 'rows_kept': int(len(self._kept)), 'strata': len(self._seen)}
+
+
+def sample_stratified(chunks: Iterable[CompactDataset], reservoir: StratifiedReservoir) -> Tuple[CompactDataset, np.ndarray]:
+    for chunk in chunks:
+        reservoir.add(chunk)
+    return reservoir.result()
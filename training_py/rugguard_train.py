@@ -1,16 +1,16 @@
 from __future__ import annotations
 
+import argparse
 import json
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Iterable, Tuple
+from typing import TYPE_CHECKING, Iterable, Optional, Tuple
 
 import numpy as np
-import pandas as pd
-from sklearn.linear_model import LogisticRegression
-from sklearn.metrics import precision_recall_fscore_support, roc_auc_score
 
-from util_ds import get_rugguard_dataset
+# pandas and the data modules load inside the functions that use them, so --help stays cheap
+if TYPE_CHECKING:
+    import pandas as pd
 
 OUTPUT_PATH = Path('models') / 'rugguard_v2.json'
 FEATURE_NAMES = ['bias', 'authority_active', 'lp_norm', 'flow_norm', 'uniques_norm', 'spread_norm', 'age_norm']
@@ -19,6 +19,8 @@ DEFAULT_THRESHOLD = 0.6
 
 
 def _pick_column(frame: pd.DataFrame, names: Iterable[str], default: float) -> pd.Series:
+    import pandas as pd
+
     for name in names:
         if name in frame.columns:
             col = pd.to_numeric(frame[name], errors='coerce').fillna(default)
@@ -27,6 +29,8 @@ def _pick_column(frame: pd.DataFrame, names: Iterable[str], default: float) -> p
 
 
 def _build_feature_frame(df: pd.DataFrame) -> pd.DataFrame:
+    import pandas as pd
+
     lp_sol = _pick_column(df, ['lp_sol', 'lpSol', 'lp_depth_sol'], 0.0)
     buys = _pick_column(df, ['buys60', 'buys_60s'], 0.0)
     sells = _pick_column(df, ['sells60', 'sells_60s'], 0.0)
@@ -55,27 +59,20 @@ def _build_feature_frame(df: pd.DataFrame) -> pd.DataFrame:
             'age_norm': age_norm,
         },
         index=df.index,
-    ).astype(float)
+    ).astype(np.float32)
     return frame
 
 
-def _chronological_split(X: pd.DataFrame, y: pd.Series, timestamp: pd.Series, holdout_ratio: float = 0.2) -> Tuple[pd.DataFrame, pd.Series, pd.DataFrame, pd.Series]:
-    aligned = pd.DataFrame({'ts': timestamp}).assign(label=y).join(X)
-    aligned = aligned.sort_values('ts')
-    n = len(aligned)
-    if n == 0:
-        return X.iloc[:0], y.iloc[:0], X.iloc[:0], y.iloc[:0]
+def _chronological_split(X: np.ndarray, y: np.ndarray, holdout_ratio: float = 0.2) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    # The compact dataset is already sorted by ts, so the split is a pair of views
+    n = X.shape[0]
     split = max(min(int(n * (1 - holdout_ratio)), n - 1), 1) if n > 5 else n
-    train = aligned.iloc[:split]
-    holdout = aligned.iloc[split:] if split < n else aligned.iloc[:0]
-    X_train = train.drop(columns=['ts', 'label'])
-    y_train = train['label']
-    X_holdout = holdout.drop(columns=['ts', 'label'])
-    y_holdout = holdout['label']
-    return X_train, y_train, X_holdout, y_holdout
+    return X[:split], y[:split], X[split:], y[split:]
 
 
 def _choose_threshold(y_true: np.ndarray, probs: np.ndarray) -> Tuple[float, dict]:
+    from sklearn.metrics import precision_recall_fscore_support
+
     best = {'f1': -1.0, 'precision': 0.0, 'recall': 0.0, 'threshold': DEFAULT_THRESHOLD}
     thresholds = np.linspace(0.2, 0.9, 36)
     for thresh in thresholds:
@@ -86,9 +83,16 @@ def _choose_threshold(y_true: np.ndarray, probs: np.ndarray) -> Tuple[float, dic
     return best['threshold'], best
 
 
-def train_rugguard() -> dict:
-    X_raw, y_raw, _ = get_rugguard_dataset(days=21)
-    if X_raw.empty or y_raw.empty:
+def train_rugguard(force: bool = False) -> Optional[dict]:
+    from fingerprint import compact_fingerprint, dataset_fingerprint, read_model, unchanged
+    from util_ds import get_rugguard_compact
+
+    ds = get_rugguard_compact(days=21)
+    fingerprint = dataset_fingerprint(compact_fingerprint(ds), __file__)
+    if not force and unchanged(read_model(OUTPUT_PATH), fingerprint):
+        return None
+    y_raw = ds.column('label_rug')
+    if ds.empty or y_raw is None:
         return {
             'version': 2,
             'created': datetime.now(timezone.utc).isoformat(timespec='seconds').replace('+00:00', 'Z'),
@@ -99,13 +103,13 @@ def train_rugguard() -> dict:
             'metrics': {},
             'train_size': 0,
             'holdout_size': 0,
+            'fingerprint': fingerprint,
         }
 
-    features = _build_feature_frame(X_raw)
-    labels = pd.to_numeric(y_raw, errors='coerce').fillna(0).clip(0, 1).astype(int)
-    timestamps = pd.to_datetime(X_raw.get('ts', pd.Series(datetime.now(timezone.utc), index=X_raw.index)))
+    features = _build_feature_frame(ds.frame()).to_numpy(dtype=np.float32)
+    labels = np.clip(np.nan_to_num(y_raw, nan=0.0), 0, 1).astype(np.int8)
 
-    X_train, y_train, X_holdout, y_holdout = _chronological_split(features, labels, timestamps)
+    X_train, y_train, X_holdout, y_holdout = _chronological_split(features, labels)
     train_size = int(y_train.shape[0])
     holdout_size = int(y_holdout.shape[0])
 
@@ -119,21 +123,25 @@ def train_rugguard() -> dict:
         'weights': DEFAULT_WEIGHTS,
         'threshold': DEFAULT_THRESHOLD,
         'metrics': {'train_size': train_size, 'holdout_size': holdout_size},
+        'fingerprint': fingerprint,
     }
 
     if train_size < 25 or len(np.unique(y_train)) < 2:
         result['status'] = 'insufficient_training_samples'
         return result
 
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.metrics import precision_recall_fscore_support, roc_auc_score
+
     clf = LogisticRegression(max_iter=1000, C=2.0, solver='lbfgs')
-    clf.fit(X_train.to_numpy(dtype=float), y_train.to_numpy(dtype=int))
+    clf.fit(X_train, y_train)
     weights = [float(clf.intercept_[0])] + [float(v) for v in clf.coef_[0]]
     result['weights'] = weights
 
-    train_probs = clf.predict_proba(X_train.to_numpy(dtype=float))[:, 1]
+    train_probs = clf.predict_proba(X_train)[:, 1]
     threshold_src = (X_holdout, y_holdout) if holdout_size >= 10 else (X_train, y_train)
-    threshold_probs = clf.predict_proba(threshold_src[0].to_numpy(dtype=float))[:, 1]
-    threshold_labels = threshold_src[1].to_numpy(dtype=int)
+    threshold_probs = clf.predict_proba(threshold_src[0])[:, 1]
+    threshold_labels = threshold_src[1]
     threshold, threshold_metrics = _choose_threshold(threshold_labels, threshold_probs)
     result['threshold'] = threshold
     result['metrics'].update(threshold_metrics)
@@ -158,9 +166,17 @@ def train_rugguard() -> dict:
 
 
 def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--force', action='store_true', help='retrain even if the dataset fingerprint is unchanged')
+    args = parser.parse_args()
+    from fingerprint import write_model
+
     OUTPUT_PATH.parent.mkdir(exist_ok=True)
-    result = train_rugguard()
-    OUTPUT_PATH.write_text(json.dumps(result, indent=2))
+    result = train_rugguard(force=args.force)
+    if result is None:
+        print('rugguard: unchanged (fingerprint match, use --force to retrain)')
+        return
+    write_model(OUTPUT_PATH, result)
     print('rugguard:', result['status'], json.dumps(result.get('metrics', {})))
 
 
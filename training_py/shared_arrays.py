@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import os
+import secrets
+import tempfile
+import weakref
+from pathlib import Path
+from typing import Dict
+
+import numpy as np
+
+# tmpfs when available, so segments live in RAM and every worker maps the same pages;
+# TRAINING_SHARED_DIR can point at local disk for matrices larger than memory
+SHARED_DIR = os.environ.get('TRAINING_SHARED_DIR') or ('/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir())
+SEGMENT_PREFIX = 'trenches-train-'
+
+# Per-process cache of attached stores, keyed by descriptor token
+_ATTACHED: Dict[str, Dict[str, np.ndarray]] = {}
+
+
+def _remove(paths) -> None:
+    for path in paths:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+
+class SharedArrays:
+    """
+    Named arrays published once as memory-mapped segments. `descriptor` is a
+    small picklable dict; workers `attach` it to get read-only views of the
+    same pages instead of unpickling private copies, so memory stays flat as
+    the pool grows. Segments are removed on close, on garbage collection and at
+    interpreter exit, whichever comes first; workers that still hold a mapping
+    keep it valid until they drop it.
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray], root: str = SHARED_DIR):
+        sweep_stale(root)
+        self.token = f'{os.getpid()}-{secrets.token_hex(8)}'
+        self.views: Dict[str, np.ndarray] = {}
+        layout = {}
+        paths = []
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            path = None
+            view = array
+            # Zero-length maps are not allowed; empty arrays are rebuilt from the descriptor alone
+            if array.size:
+                path = str(Path(root) / f'{SEGMENT_PREFIX}{self.token}-{name}')
+                paths.append(path)
+                segment = np.memmap(path, dtype=array.dtype, mode='w+', shape=array.shape)
+                segment[...] = array
+                segment.flush()
+                del segment
+                view = np.memmap(path, dtype=array.dtype, mode='r', shape=array.shape)
+            self.views[name] = view
+            layout[name] = (path, array.dtype.str, array.shape)
+        self.descriptor = {'token': self.token, 'arrays': layout}
+        self._finalizer = weakref.finalize(self, _remove, paths)
+
+    @property
+    def nbytes(self) -> int:
+        return int(sum(v.nbytes for v in self.views.values()))
+
+    def close(self) -> None:
+        _ATTACHED.pop(self.token, None)
+        self._finalizer()
+
+    def __enter__(self) -> 'SharedArrays':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def attach(descriptor: dict) -> Dict[str, np.ndarray]:
+    """Read-only views of a published store; mapped once per process and reused across tasks."""
+    token = descriptor['token']
+    views = _ATTACHED.get(token)
+    if views is None:
+        views = {}
+        for name, (path, dtype, shape) in descriptor['arrays'].items():
+            if path is None:
+                views[name] = np.empty(shape, dtype=np.dtype(dtype))
+            else:
+                views[name] = np.memmap(path, dtype=np.dtype(dtype), mode='r', shape=tuple(shape))
+        _ATTACHED[token] = views
+    return views
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def sweep_stale(root: str = SHARED_DIR) -> int:
+    """Remove segments whose owning process died without cleaning up (e.g. SIGKILL)."""
+    removed = 0
+    for path in Path(root).glob(f'{SEGMENT_PREFIX}*'):
+        owner = path.name[len(SEGMENT_PREFIX):].split('-', 1)[0]
+        if owner.isdigit() and not _pid_alive(int(owner)):
+            _remove([path])
+            removed += 1
+    return removed
@@ -0,0 +1,252 @@
+from __future__ import annotations
+
+import hashlib
+import re
+from typing import Dict, Iterable, List, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+from compact_ds import CompactDataset, shared_dictionary
+from drift import decode_json_columns
+from util_ds import get_author_quality, get_candidate_names, get_logged_alpha_features, iter_social_posts, latest_before
+
+# services/alpha-ranker: listAuthorsByKeywords(keywords, ts - 60 min, 200) and a top-5 quality mean
+SOCIAL_WINDOW_SEC = 3600
+MAX_AUTHORS = 200
+TOP_K = 5
+# Fallback mean when mentioning authors have no author_features row yet
+FALLBACK_MENTIONS_SCALE = 50
+FALLBACK_QUALITY_CAP = 0.4
+# Window expansion is done in blocks of at most this many (query, event) rows
+EXPAND_ROWS = 2_000_000
+SOCIAL_COLUMNS = ('author_quality_mean', 'author_quality_top', 'author_mentions', 'lunar_boost')
+_TOKEN = re.compile(r'\$?[a-z0-9]+')
+
+
+def alpha_keywords(symbol: str, name: str) -> Set[str]:
+    """Same keywords as alpha-ranker extractAlphaKeywords."""
+    keywords = set()
+    symbol = (symbol or '').lower()
+    if len(symbol) > 1:
+        keywords.add(symbol)
+        if not symbol.startswith('$') and len(symbol) > 2:
+            keywords.add(f'${symbol}')
+    for part in re.split(r'[^a-z0-9]+', (name or '').lower()):
+        if len(part) > 2:
+            keywords.add(part)
+    return keywords
+
+
+def _keyword_index(mint_codes: Iterable[int]) -> Dict[str, List[int]]:
+    names = get_candidate_names()
+    dictionary = shared_dictionary('mint')
+    index: Dict[str, List[int]] = {}
+    for code in mint_codes:
+        symbol, name = names.get(dictionary.values[code], ('', ''))
+        for keyword in alpha_keywords(symbol, name):
+            index.setdefault(keyword, []).append(code)
+    return index
+
+
+def _keyword_table(index: Dict[str, List[int]]) -> Tuple[pd.Index, np.ndarray, np.ndarray]:
+    """(keywords, CSR offsets, flattened mint codes): keyword i maps to mints[offsets[i]:offsets[i + 1]]."""
+    keywords = pd.Index(sorted(index))
+    sizes = np.array([len(index[keyword]) for keyword in keywords], dtype=np.int64)
+    offsets = np.concatenate([[0], np.cumsum(sizes)])
+    mints = np.array([code for keyword in keywords for code in index[keyword]], dtype=np.int64)
+    return keywords, offsets, mints
+
+
+def _batch_events(
+    keywords: pd.Index, offsets: np.ndarray, mints: np.ndarray, texts: List[str]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """(post row, mint code) for every distinct post x mint hit in one batch."""
+    tokens = pd.Series(texts, dtype=object).fillna('').astype(str).str.lower().str.findall(_TOKEN).explode().dropna()
+    # LIKE '%bonk%' also matches "$bonk"
+    dollar = tokens[tokens.str.startswith('$')]
+    tokens = pd.concat([tokens, dollar.str[1:]])
+    kw = keywords.get_indexer(tokens.to_numpy())
+    hit = kw >= 0
+    post, kw = tokens.index.to_numpy(dtype=np.int64)[hit], kw[hit]
+    counts = offsets[kw + 1] - offsets[kw]
+    first = np.repeat(offsets[kw] - (np.cumsum(counts) - counts), counts)
+    mint = mints[first + np.arange(first.size)]
+    pairs = np.unique((np.repeat(post, counts) << 32) | mint)
+    return pairs >> 32, pairs & 0xFFFFFFFF
+
+
+def mention_events(index: Dict[str, List[int]], start_s: int, end_s: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, List[str]]:
+    """
+    (mint code, ts, author code) for every post whose tokens hit a mint's
+    keywords, plus the author code -> author_id list. Token matching stands in
+    for the service's LIKE '%kw%'; it only differs when a keyword is a strict
+    substring of a longer word. Each batch is tokenised and joined against
+    the keyword table as whole columns.
+    """
+    empty = np.empty(0, dtype=np.int64)
+    if not index:
+        return empty, empty, empty, []
+    keywords, offsets, mints = _keyword_table(index)
+    ev_mint: List[np.ndarray] = []
+    ev_ts: List[np.ndarray] = []
+    ev_author: List[np.ndarray] = []
+    for ts, post_authors, texts in iter_social_posts(start_s, end_s):
+        post, mint = _batch_events(keywords, offsets, mints, texts)
+        authors = pd.Series(post_authors, dtype=object).fillna('').astype(str).to_numpy()[post]
+        named = authors != ''
+        ev_mint.append(mint[named])
+        ev_ts.append(ts.astype(np.int64)[post[named]])
+        ev_author.append(authors[named])
+    if not ev_mint:
+        return empty, empty, empty, []
+    codes, authors = pd.factorize(np.concatenate(ev_author))
+    return np.concatenate(ev_mint), np.concatenate(ev_ts), codes.astype(np.int64), list(authors)
+
+
+def _group_rank(groups: np.ndarray) -> np.ndarray:
+    """Position of each row within its run of equal (sorted) group ids."""
+    starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+    return np.arange(groups.size) - np.repeat(starts, np.diff(np.r_[starts, groups.size]))
+
+
+def _window_block(
+    lo: np.ndarray,
+    hi: np.ndarray,
+    q_ts: np.ndarray,
+    e_ts: np.ndarray,
+    e_author: np.ndarray,
+    quality: np.ndarray,
+    window_sec: int,
+    max_authors: int,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(mean, top-k mean, mentions) for queries whose windows are event rows [lo, hi)."""
+    m = lo.size
+    lengths = hi - lo
+    qid = np.repeat(np.arange(m, dtype=np.int64), lengths)
+    pos = np.arange(qid.size) - np.repeat(np.cumsum(lengths) - lengths, lengths) + np.repeat(lo, lengths)
+    author = e_author[pos]
+    age = np.repeat(q_ts, lengths) - e_ts[pos]
+    # (query, author, age) packed into single int64 sort keys: ~21 + 29 + 12 bits at the block and window sizes used
+    a_bits, g_bits = max(int(quality.size).bit_length(), 1), max(int(window_sec).bit_length(), 1)
+
+    # Latest mention per (query, author), then the newest max_authors per query:
+    # the service's SELECT DISTINCT author ... ORDER BY captured_at DESC LIMIT 200
+    key = np.sort((qid << (a_bits + g_bits)) | (author << g_bits) | age)
+    pair = key >> g_bits
+    latest = key[np.r_[True, pair[1:] != pair[:-1]]]
+    qid, author, age = latest >> (a_bits + g_bits), (latest >> g_bits) & ((1 << a_bits) - 1), latest & ((1 << g_bits) - 1)
+    key = np.sort((qid << (g_bits + a_bits)) | (age << a_bits) | author)
+    qid = key >> (g_bits + a_bits)
+    capped = _group_rank(qid) < max_authors
+    qid, author = qid[capped], key[capped] & ((1 << a_bits) - 1)
+    mentions = np.bincount(qid, minlength=m).astype(np.float64)
+
+    rated = ~np.isnan(quality[author])
+    qid, author = qid[rated], author[rated]
+    rated_n = np.bincount(qid, minlength=m)
+    mean = np.bincount(qid, weights=quality[author], minlength=m) / np.maximum(rated_n, 1)
+    # Authors ranked once by quality, best first, so the top-k per query is another integer sort
+    by_quality = np.argsort(-quality, kind='stable')
+    quality_rank = np.empty_like(by_quality)
+    quality_rank[by_quality] = np.arange(by_quality.size)
+    key = np.sort((qid << a_bits) | quality_rank[author])
+    top = key[_group_rank(key >> a_bits) < TOP_K]
+    top_qid = top >> a_bits
+    top_values = quality[by_quality[top & ((1 << a_bits) - 1)]]
+    top_mean = np.bincount(top_qid, weights=top_values, minlength=m) / np.maximum(np.bincount(top_qid, minlength=m), 1)
+
+    fallback = (rated_n == 0) & (mentions > 0)
+    mean[fallback] = np.minimum(1.0, np.log1p(mentions[fallback]) / np.log1p(FALLBACK_MENTIONS_SCALE)) * FALLBACK_QUALITY_CAP
+    return mean, top_mean, mentions
+
+
+def window_author_stats(
+    ev_mint: np.ndarray,
+    ev_ts: np.ndarray,
+    ev_author: np.ndarray,
+    quality: np.ndarray,
+    q_mint: np.ndarray,
+    q_ts: np.ndarray,
+    window_sec: int = SOCIAL_WINDOW_SEC,
+    max_authors: int = MAX_AUTHORS,
+) -> Dict[str, np.ndarray]:
+    """
+    Distinct-author mentions and author quality mean / top-k over
+    [t - window_sec, t] for each (mint, t) query. Events are sorted once by
+    (mint, ts); each query's window is a searchsorted row range, and the
+    windows are expanded and reduced with grouped bincounts in blocks of at
+    most EXPAND_ROWS event rows. Like the service, only the max_authors most
+    recently active authors count towards mentions and quality.
+    """
+    n = q_mint.shape[0]
+    out = {name: np.zeros(n, dtype=np.float32) for name in SOCIAL_COLUMNS[:3]}
+    if n == 0 or ev_mint.size == 0:
+        return out
+    # Epoch seconds fit in 33 bits, so (mint, ts) packs into one sortable key as in latest_before
+    ev_key = (ev_mint.astype(np.int64) << 33) | ev_ts
+    order = np.argsort(ev_key, kind='stable')
+    ev_key, e_ts, e_author = ev_key[order], ev_ts[order], ev_author[order]
+    known = q_mint >= 0
+    q_key = np.where(known, q_mint, 0).astype(np.int64) << 33
+    lo = np.searchsorted(ev_key, q_key | np.maximum(q_ts - window_sec, 0), side='left')
+    hi = np.where(known, np.searchsorted(ev_key, q_key | q_ts, side='right'), lo)
+
+    ends = np.cumsum(hi - lo)
+    start = 0
+    while start < n:
+        budget = ends[start] - (hi[start] - lo[start]) + EXPAND_ROWS
+        stop = max(int(np.searchsorted(ends, budget, side='right')), start + 1)
+        mean, top, mentions = _window_block(
+            lo[start:stop], hi[start:stop], q_ts[start:stop], e_ts, e_author, quality, window_sec, max_authors
+        )
+        out['author_quality_mean'][start:stop] = mean
+        out['author_quality_top'][start:stop] = top
+        out['author_mentions'][start:stop] = mentions
+        start = stop
+    return out
+
+
+def logged_lunar_boost(q_mint: np.ndarray, q_ts: np.ndarray, window_sec: int = SOCIAL_WINDOW_SEC) -> np.ndarray:
+    """
+    lunar_boost from the latest alpha score logged for the mint at or before t.
+    The LunarCrush stream itself is not persisted, so the scoring log is the
+    only record of what the service saw.
+    """
+    boost = np.zeros(q_mint.shape[0], dtype=np.float32)
+    if q_mint.size == 0:
+        return boost
+    ts, mints, payloads = get_logged_alpha_features(int(q_ts.min()) - window_sec, int(q_ts.max()))
+    if ts.size == 0:
+        return boost
+    values = decode_json_columns(payloads, ('lunar_boost',))['lunar_boost']
+    codes = shared_dictionary('mint').encode(pd.Series(mints, dtype=object)).astype(np.int64)
+    row = latest_before(codes, ts, q_mint, q_ts)
+    hit = (row >= 0) & (q_ts - ts[np.maximum(row, 0)] <= window_sec)
+    boost[hit] = np.nan_to_num(values[row[hit]])
+    return np.clip(boost, 0.0, 0.2)
+
+
+def social_features(ds: CompactDataset, window_sec: int = SOCIAL_WINDOW_SEC) -> Dict[str, np.ndarray]:
+    """SOCIAL_COLUMNS for every row of an alpha dataset, as of the row's entry ts."""
+    n = len(ds)
+    q_mint = ds.codes.get('mint')
+    if n == 0 or q_mint is None:
+        return {name: np.zeros(n, dtype=np.float32) for name in SOCIAL_COLUMNS}
+    q_mint = q_mint.astype(np.int64)
+    q_ts = ds.ts.astype(np.int64)
+    index = _keyword_index(np.unique(q_mint[q_mint >= 0]).tolist())
+    ev_mint, ev_ts, ev_author, authors = mention_events(index, int(q_ts.min()) - window_sec, int(q_ts.max()))
+    known = get_author_quality()
+    quality = np.array([known.get(author, np.nan) for author in authors], dtype=np.float64)
+    out = window_author_stats(ev_mint, ev_ts, ev_author, quality, q_mint, q_ts, window_sec)
+    out['lunar_boost'] = logged_lunar_boost(q_mint, q_ts, window_sec)
+    return out
+
+
+def social_fingerprint(columns: Dict[str, np.ndarray]) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    for name in sorted(columns):
+        digest.update(name.encode())
+        digest.update(np.ascontiguousarray(columns[name], dtype=np.float32).tobytes())
+    return digest.hexdigest()
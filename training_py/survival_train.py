@@ -1,30 +1,37 @@
+import argparse
 import json
 from pathlib import Path
 from datetime import datetime
+from typing import Optional
 
 import numpy as np
-import pandas as pd
 
-from util_ds import get_survival_dataset
+OUTPUT_PATH = Path('models') / 'survival_v1.json'
 
 
-def main() -> None:
-    out_dir = Path('models')
-    out_dir.mkdir(exist_ok=True)
+def train_survival(force: bool = False) -> Optional[dict]:
+    # Loaded here rather than at import so --help stays cheap
+    import pandas as pd
+
+    from fingerprint import dataset_fingerprint, read_model, unchanged
+    from util_ds import get_survival_dataset
+
     df = get_survival_dataset(days=14)
+    fingerprint = dataset_fingerprint(df.attrs.get('fingerprint'), __file__)
+    if not force and unchanged(read_model(OUTPUT_PATH), fingerprint):
+        return None
     result = {
         'version': 1,
         'created': datetime.utcnow().isoformat() + 'Z',
         'metrics': {},
         'params': {},
         'status': 'ok',
-        'sample_size': 0
+        'sample_size': 0,
+        'fingerprint': fingerprint
     }
     if df.empty:
         result['status'] = 'no_data'
-        (out_dir / 'survival_v1.json').write_text(json.dumps(result, indent=2))
-        print('survival: no_data')
-        return
+        return result
 
     sample_size = int(len(df))
     result['sample_size'] = sample_size
@@ -54,7 +61,24 @@ def main() -> None:
         'sample_size': sample_size
     }
 
-    (out_dir / 'survival_v1.json').write_text(json.dumps(result, indent=2))
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--force', action='store_true', help='retrain even if the dataset fingerprint is unchanged')
+    args = parser.parse_args()
+    from fingerprint import write_model
+
+    OUTPUT_PATH.parent.mkdir(exist_ok=True)
+    result = train_survival(force=args.force)
+    if result is None:
+        print('survival: unchanged (fingerprint match, use --force to retrain)')
+        return
+    write_model(OUTPUT_PATH, result)
+    if result['status'] == 'no_data':
+        print('survival: no_data')
+        return
     print('survival:', result['status'], json.dumps(result['metrics']))
 
 
@@ -0,0 +1,37 @@
+import numpy as np
+
+import drift
+from drift import compare, reference_histograms
+
+
+def test_compare_flags_zero_width_reference_features():
+    rng = np.random.default_rng(11)
+    train = np.column_stack([np.zeros(1_000), rng.normal(size=1_000), np.full(1_000, 5.0)])
+    reference = reference_histograms(train, ['ctx_missing', 'spread', 'constant'])
+    assert reference['lo'][0] == reference['hi'][0]
+
+    live = np.column_stack([rng.normal(size=500), rng.normal(loc=2.0, size=500), np.full(500, 5.0)])
+    result = compare(reference, live)
+
+    np.testing.assert_array_equal(result['monitorable'], [False, True, False])
+    for metric in ('psi', 'ks', 'mean_shift'):
+        assert np.isnan(result[metric][[0, 2]]).all()
+        assert np.isfinite(result[metric][1])
+    # The monitorable feature still sees its shift
+    assert result['psi'][1] > 0.2 and result['mean_shift'][1] > 1.0
+    np.testing.assert_array_equal(result['live_rows'], [500, 500, 500])
+
+
+def test_evaluate_skips_a_fully_unmonitorable_reference(monkeypatch):
+    reference = reference_histograms(np.zeros((1_000, 2)), ['lpSol', 'spreadBps'])
+    monkeypatch.setattr(drift, '_read_reference', lambda name: reference)
+
+    def live_source(*args):
+        raise AssertionError('live rows read for an unmonitorable reference')
+
+    monkeypatch.setitem(drift.LIVE_SOURCES, 'fillnet', live_source)
+    report = drift.evaluate('fillnet')
+
+    assert report['status'] == 'unmonitorable'
+    assert report['decision'] == 'skip'
+    assert report['unmonitorable'] == ['lpSol', 'spreadBps']
@@ -0,0 +1,55 @@
+import json
+
+import pytest
+
+import backtest_vec
+import promote_gpu
+
+PASSING_METRICS = {'auc_10m': 0.82, 'train_size_10m': 5_000, 'precision_at_50_60m': 0.7}
+
+
+def _candidate(digest: str = 'cand-digest') -> dict:
+    return {'status': 'ok', 'metrics': dict(PASSING_METRICS), 'fingerprint': {'digest': digest}}
+
+
+def _raise(*args):
+    raise RuntimeError('trades table locked')
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'models').mkdir()
+    return tmp_path
+
+
+def test_gate_alpha_fails_closed_when_the_backtest_raises(monkeypatch):
+    monkeypatch.setattr(backtest_vec, 'alpha_promotion_check', _raise)
+    ok, reason = promote_gpu.gate_alpha({'metrics': {}}, _candidate())
+    assert ok is False
+    assert reason == 'vec_backtest_error(trades table locked)'
+
+
+def test_backtest_error_is_not_remembered_so_the_candidate_is_retried(workdir, monkeypatch):
+    monkeypatch.setattr(backtest_vec, 'alpha_promotion_check', _raise)
+    cand_path, prod_path = workdir / 'models' / 'cand.json', workdir / 'models' / 'prod.json'
+    cand_path.write_text(json.dumps(_candidate()))
+    prod_path.write_text(json.dumps({'status': 'ok', 'metrics': {}}))
+
+    outcome = promote_gpu.maybe_promote('alpha', str(prod_path), str(cand_path), {})
+
+    assert outcome == 'PROMOTE alpha=skipped reason=vec_backtest_error(trades table locked)'
+    assert json.loads(prod_path.read_text())['metrics'] == {}
+    assert not (workdir / promote_gpu.PROMOTE_STATE_PATH).exists()
+
+
+def test_unchanged_fingerprint_skips_before_the_gate(workdir, monkeypatch):
+    monkeypatch.setattr(backtest_vec, 'alpha_promotion_check', _raise)
+    monkeypatch.setattr(promote_gpu, 'gate_alpha', _raise)
+    cand_path = workdir / 'models' / 'cand.json'
+    cand_path.write_text(json.dumps(_candidate()))
+    promote_gpu.record_evaluated('alpha', 'cand-digest', 'gate_failed')
+
+    outcome = promote_gpu.maybe_promote('alpha', str(workdir / 'models' / 'prod.json'), str(cand_path), {})
+
+    assert outcome == 'PROMOTE alpha=skipped reason=unchanged_fingerprint(gate_failed)'
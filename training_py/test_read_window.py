@@ -0,0 +1,47 @@
+import sqlite3
+
+import numpy as np
+import pytest
+
+import util_ds
+
+SQL = 'SELECT * FROM fills WHERE ts >= ? AND ts < ?'
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    path = str(tmp_path / 'window.db')
+    now, _ = util_ds.time_bounds(0)
+    rng = np.random.default_rng(3)
+    # Unique timestamps well inside a 10-day window, so the two reads' bounds cannot disagree at the edges
+    ts = now - rng.choice(np.arange(3_600, 9 * 86_400), size=5_000, replace=False)
+    rows = [
+        (int(t), f'route{i % 3}', f'mint{i % 41}', float(i), None if i % 7 == 0 else float(i) / 3)
+        for i, t in enumerate(ts)
+    ]
+    with sqlite3.connect(path) as conn:
+        conn.execute('CREATE TABLE fills (ts INTEGER, route TEXT, mint TEXT, row_id REAL, x REAL)')
+        conn.executemany('INSERT INTO fills VALUES (?, ?, ?, ?, ?)', rows)
+        # An out-of-window row on each side
+        conn.executemany(
+            'INSERT INTO fills VALUES (?, ?, ?, ?, ?)',
+            [(now - 11 * 86_400, 'r', 'm', -1.0, 0.0), (now + 3_600, 'r', 'm', -2.0, 0.0)],
+        )
+    monkeypatch.setattr(util_ds, 'DEFAULT_DB', path)
+    monkeypatch.setattr(util_ds, '_connect', lambda: sqlite3.connect(path))
+    return path
+
+
+@pytest.mark.parametrize('executor', ['thread', 'process'])
+def test_sharded_read_matches_single_read(db_path, monkeypatch, executor):
+    monkeypatch.setattr(util_ds, 'READ_EXECUTOR', executor)
+    single = util_ds._read_window(SQL, 10, shards=1)
+    sharded = util_ds._read_window(SQL, 10, shards=4)
+
+    assert len(single) == 5_000
+    assert np.all(np.diff(single.ts) > 0)
+    np.testing.assert_array_equal(sharded.ts, single.ts)
+    assert sharded.columns == single.columns
+    np.testing.assert_array_equal(sharded.values, single.values)
+    for name in ('route', 'mint'):
+        np.testing.assert_array_equal(sharded.categorical(name), single.categorical(name))
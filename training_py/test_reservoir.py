@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import reservoir
+from compact_ds import compact_frames
+from reservoir import StratifiedReservoir
+
+STRATUM = ['source', 'route', 'y_fill']
+
+
+def _chunks(n_rows: int, chunk_rows: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame({
+        'ts': np.arange(n_rows, dtype=np.int64),
+        'source': rng.choice(['real', 'sim'], size=n_rows, p=[0.1, 0.9]),
+        'route': rng.choice(['jito', 'rpc', 'bundle'], size=n_rows),
+        'y_fill': (rng.random(n_rows) < 0.3).astype(np.float64),
+        # Unique per row, exact in float32
+        'row_id': np.arange(n_rows, dtype=np.float64),
+    })
+    return [compact_frames([frame.iloc[i:i + chunk_rows]]) for i in range(0, n_rows, chunk_rows)]
+
+
+def _fill(res: StratifiedReservoir, chunks) -> StratifiedReservoir:
+    for chunk in chunks:
+        res.add(chunk)
+    return res
+
+
+def _sharded(template: StratifiedReservoir, chunks, shards: int) -> StratifiedReservoir:
+    per_shard = -(-len(chunks) // shards)
+    parts = [_fill(template.empty_like(i + 1), chunks[i * per_shard:(i + 1) * per_shard]) for i in range(shards)]
+    for part in parts:
+        template.merge(part)
+    return template
+
+
+def _stratum_table(ds, weights) -> pd.DataFrame:
+    frame = ds.frame()
+    frame['w'] = weights
+    return frame.groupby(STRATUM, observed=True)['w'].agg(['size', 'sum'])
+
+
+@pytest.fixture(autouse=True)
+def _small_compaction(monkeypatch):
+    # Compact every few chunks so the admission bar and buffered merges are exercised
+    monkeypatch.setattr(reservoir, 'MIN_COMPACT_ROWS', 500)
+
+
+def test_uncapped_shard_merge_keeps_every_row():
+    chunks = _chunks(6_000, 400)
+    caps = {'real': 10_000, 'sim': 10_000}
+    single, single_w = _fill(StratifiedReservoir('y_fill', caps), chunks).result()
+    merged, merged_w = _sharded(StratifiedReservoir('y_fill', caps), chunks, shards=3).result()
+
+    np.testing.assert_array_equal(single.ts, np.arange(6_000))
+    np.testing.assert_array_equal(merged.ts, single.ts)
+    np.testing.assert_array_equal(merged.column('row_id'), single.column('row_id'))
+    np.testing.assert_allclose(merged_w, single_w)
+
+
+def test_capped_shard_merge_matches_single_pass_per_stratum():
+    chunks = _chunks(20_000, 500)
+    caps = {'real': 150, 'sim': 300}
+    single_res = _fill(StratifiedReservoir('y_fill', caps, source_weights={}), chunks)
+    merged_res = _sharded(StratifiedReservoir('y_fill', caps, source_weights={}), chunks, shards=4)
+    single, single_w = single_res.result()
+    merged, merged_w = merged_res.result()
+
+    assert merged_res.rows_seen == single_res.rows_seen == 20_000
+    assert np.all(np.diff(merged.ts) >= 0)
+    assert np.unique(merged.column('row_id')).size == len(merged)
+    single_table = _stratum_table(single, single_w)
+    merged_table = _stratum_table(merged, merged_w)
+    # Each stratum keeps min(cap, seen) rows and the weights stand for the same raw count
+    pd.testing.assert_series_equal(merged_table['size'], single_table['size'])
+    np.testing.assert_allclose(merged_table['sum'], single_table['sum'], rtol=1e-5)
+    seen = pd.concat([chunk.frame() for chunk in chunks]).groupby(STRATUM, observed=True).size()
+    cap = np.where(seen.index.get_level_values('source') == 'real', caps['real'], caps['sim'])
+    np.testing.assert_array_equal(single_table['size'].to_numpy(), np.minimum(seen.to_numpy(), cap))
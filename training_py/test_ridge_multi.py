@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+
+from fillnet_train_xgb import _ridge_multi
+
+Ridge = pytest.importorskip('sklearn.linear_model').Ridge
+
+
+def test_ridge_multi_matches_sklearn_per_target():
+    rng = np.random.default_rng(7)
+    X = rng.normal(size=(400, 6))
+    Y = X @ rng.normal(size=(6, 3)) + rng.normal(size=3) + rng.normal(scale=0.1, size=(400, 3))
+    # One full target, two with their own missing rows
+    Y[rng.random(400) < 0.2, 1] = np.nan
+    Y[:50, 2] = np.nan
+    w = rng.uniform(0.2, 3.0, size=400)
+
+    coefs = _ridge_multi(X, Y, w, alpha=2.5)
+
+    for t in range(Y.shape[1]):
+        rows = ~np.isnan(Y[:, t])
+        ref = Ridge(alpha=2.5).fit(X[rows], Y[rows, t], sample_weight=w[rows])
+        np.testing.assert_allclose(coefs[0, t], ref.intercept_, rtol=1e-8, atol=1e-10)
+        np.testing.assert_allclose(coefs[1:, t], ref.coef_, rtol=1e-8, atol=1e-10)
@@ -0,0 +1,374 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from alpha_ranker_train import OUTPUT_PATH as ALPHA_OUTPUT, train_alpha
+from fillnet_train_xgb import OUTPUT_PATH as FILLNET_OUTPUT, train_fillnet
+from rugguard_train import OUTPUT_PATH as RUGGUARD_OUTPUT, train_rugguard
+from survival_train import OUTPUT_PATH as SURVIVAL_OUTPUT, train_survival
+
+# pandas-backed data modules, drift and promote_gpu load once the daemon starts, so --help stays cheap
+if TYPE_CHECKING:
+    from compact_ds import CompactDataset
+
+DEFAULT_PORT = int(os.environ.get('TRAINER_DAEMON_PORT', '4024'))
+FILLNET_WINDOW_DAYS = 21
+SAMPLE_CHUNK_ROWS = 50_000
+TRAINED_MODELS = ('fillnet', 'alpha', 'rugguard', 'survival')
+OUTPUT_PATHS = (FILLNET_OUTPUT, ALPHA_OUTPUT, RUGGUARD_OUTPUT, SURVIVAL_OUTPUT)
+
+
+def _escape_label(value: str) -> str:
+    # Exposition-format escaping; label values include table, model and feature names
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class _Metrics:
+    """Minimal Prometheus text exposition; mirrors the gauge/counter names the Node services use."""
+
+    HELP = {
+        'trainer_daemon_window_rows': ('gauge', 'Rows held in the warm fillnet window'),
+        'trainer_daemon_window_bytes': ('gauge', 'Bytes held by the warm fillnet window'),
+        'trainer_daemon_watermark_rowid': ('gauge', 'Last rowid ingested per source table'),
+        'trainer_daemon_rows_ingested_total': ('counter', 'Rows appended to the warm window'),
+        'trainer_daemon_poll_errors_total': ('counter', 'Failed source-table polls'),
+        'trainer_daemon_runs_total': ('counter', 'Retrain runs by model and outcome'),
+        'trainer_daemon_train_seconds': ('gauge', 'Duration of the last retrain per model'),
+        'trainer_daemon_last_train_epoch_seconds': ('gauge', 'Unix time of the last retrain per model'),
+        'trainer_daemon_promotions_total': ('counter', 'Promotion gate results by model and outcome'),
+        'trainer_daemon_drift_psi': ('gauge', 'Population stability index of live vs training features'),
+        'trainer_daemon_drift_ks': ('gauge', 'Binned KS distance of live vs training features'),
+        'trainer_daemon_drift_mean_shift': ('gauge', 'Live mean minus training mean, in training std units'),
+        'trainer_daemon_drift_retrain': ('gauge', '1 if the last drift check marked the model for retraining'),
+        'trainer_daemon_drift_check_seconds': ('gauge', 'Duration of the last drift check per model'),
+    }
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+
+    def set(self, name: str, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[(name, tuple(sorted(labels.items())))] = float(value)
+
+    def inc(self, name: str, amount: float = 1.0, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            items = sorted(self._values.items())
+        for name, (kind, help_text) in self.HELP.items():
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for (metric, labels), value in items:
+                if metric != name:
+                    continue
+                label_str = ','.join(f'{k}="{_escape_label(v)}"' for k, v in labels)
+                lines.append(f'{name}{{{label_str}}} {value}' if label_str else f'{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+def _last_written(paths: Tuple[Path, ...]) -> float:
+    """Oldest write time among the candidates on disk (0 when there are none), so a restart keeps the schedule."""
+    stamps = [path.stat().st_mtime for path in map(Path, paths) if path.exists()]
+    return min(stamps) if stamps else 0.0
+
+
+def _chunks(ds: CompactDataset, rows: int) -> Iterator[CompactDataset]:
+    for start in range(0, len(ds), rows):
+        yield ds.rows(start, start + rows)
+
+
+class TrainerDaemon:
+    """
+    Keeps the fillnet window warm in memory (appending new exec/sim outcomes by
+    rowid watermark), retrains on a schedule, on POST /control/retrain or once
+    enough new rows arrived, and runs promote_gpu gating in-process. Only
+    fillnet's fill-level window is held warm; alpha, rugguard and survival
+    train on per-trade/per-mint views that are orders of magnitude smaller and
+    are read from SQLite on each retrain.
+    """
+
+    def __init__(
+        self,
+        interval_sec: float = 3600.0,
+        poll_sec: float = 30.0,
+        min_new_rows: int = 0,
+        jobs: int = 1,
+        promote: bool = True,
+        drift_sec: float = 1800.0,
+        drift_gate: bool = True,
+    ):
+        self.interval_sec = interval_sec
+        self.poll_sec = poll_sec
+        self.min_new_rows = min_new_rows
+        self.jobs = jobs
+        self.promote = promote
+        self.drift_sec = drift_sec
+        self.drift_gate = drift_gate
+        self.drift_reports: Dict[str, dict] = {}
+        self.last_drift_ts = 0.0
+        from compact_ds import empty_dataset
+        from util_ds import FILL_SOURCE_TABLES
+
+        self.metrics = _Metrics()
+        self.window = empty_dataset()
+        self.watermarks: Dict[str, int] = {table: 0 for table in FILL_SOURCE_TABLES}
+        self.rows_since_train = 0
+        self.last_train: Dict[str, Dict[str, Any]] = {}
+        self.last_train_ts = _last_written(OUTPUT_PATHS)
+        self.started = time.time()
+        self._trigger = threading.Event()
+        self._trigger_force = False
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    # -- data -------------------------------------------------------------
+    def poll(self) -> int:
+        from compact_ds import concat_datasets, sort_by_ts
+        from util_ds import FILL_SOURCE_TABLES, get_fillnet_increment, max_rowid
+
+        since = int(time.time()) - FILLNET_WINDOW_DAYS * 86400
+        parts = [self.window]
+        added = 0
+        for table in FILL_SOURCE_TABLES:
+            try:
+                hi = max_rowid(table)
+                lo = self.watermarks[table]
+                if hi > lo:
+                    increment = get_fillnet_increment(table, lo, hi, since)
+                    parts.append(increment)
+                    added += len(increment)
+                    self.watermarks[table] = hi
+            except Exception as exc:
+                self.metrics.inc('trainer_daemon_poll_errors_total', table=table)
+                print(f'trainer_daemon: poll {table} failed: {exc}', flush=True)
+            self.metrics.set('trainer_daemon_watermark_rowid', self.watermarks[table], table=table)
+        window = sort_by_ts(concat_datasets(parts)) if added else self.window
+        # Rows are ts-sorted, so eviction of the expired head is a view
+        cutoff = int(np.searchsorted(window.ts, since, side='left'))
+        window = window.rows(cutoff) if cutoff else window
+        with self._lock:
+            self.window = window
+            self.rows_since_train += added
+        self.metrics.inc('trainer_daemon_rows_ingested_total', added)
+        self.metrics.set('trainer_daemon_window_rows', len(window))
+        self.metrics.set('trainer_daemon_window_bytes', window.nbytes)
+        return added
+
+    # -- drift ------------------------------------------------------------
+    def check_drift(self) -> List[str]:
+        """Compare live inputs with each model's training reference; returns models marked for retraining."""
+        import drift
+
+        self.drift_reports = drift.evaluate_all()
+        self.last_drift_ts = time.time()
+        for name, report in self.drift_reports.items():
+            self.metrics.set('trainer_daemon_drift_retrain', 1 if report['decision'] == 'retrain' else 0, model=name)
+            self.metrics.set('trainer_daemon_drift_check_seconds', report.get('seconds', 0.0), model=name)
+            for feature, scores in report.get('features', {}).items():
+                self.metrics.set('trainer_daemon_drift_psi', scores['psi'], model=name, feature=feature)
+                self.metrics.set('trainer_daemon_drift_ks', scores['ks'], model=name, feature=feature)
+                self.metrics.set('trainer_daemon_drift_mean_shift', scores['mean_shift'], model=name, feature=feature)
+        # no_reference/insufficient_live/error also come back as 'retrain'; only real drift triggers an off-schedule run
+        return [name for name, r in self.drift_reports.items() if r['decision'] == 'retrain' and r['status'] == 'ok']
+
+    def _scheduled_models(self) -> List[str]:
+        # Models without (enough) live feature logs or a monitorable reference are always retrained; monitored ones only when drifted
+        self.check_drift()
+        stable = {name for name, r in self.drift_reports.items() if r['decision'] == 'skip' and r['status'] == 'ok'}
+        return [name for name in TRAINED_MODELS if name not in stable]
+
+    # -- training ---------------------------------------------------------
+    def request_retrain(self, force: bool = False) -> None:
+        # Under the lock so a concurrent take in run() cannot drop the force flag
+        with self._lock:
+            self._trigger_force = self._trigger_force or force
+            self._trigger.set()
+
+    def _due(self) -> Optional[str]:
+        if self._trigger.is_set():
+            return 'trigger'
+        if time.time() - self.last_train_ts >= self.interval_sec:
+            return 'schedule'
+        if self.min_new_rows and self.rows_since_train >= self.min_new_rows:
+            return 'new_rows'
+        if self.drift_sec and time.time() - self.last_drift_ts >= self.drift_sec:
+            return 'drift'
+        return None
+
+    def _train_fillnet(self, force: bool) -> Optional[dict]:
+        from reservoir import StratifiedReservoir, sample_stratified
+
+        reservoir = StratifiedReservoir('y_fill')
+        sample = sample_stratified(_chunks(self.window, SAMPLE_CHUNK_ROWS), reservoir)
+        return train_fillnet(force=force, reservoir=reservoir, jobs=self.jobs, sample=sample)
+
+    def retrain(self, reason: str, force: bool = False, models: Optional[List[str]] = None) -> Dict[str, str]:
+        import promote_gpu
+        from fingerprint import write_model
+
+        trainers: Dict[str, Tuple[Callable[[bool], Optional[dict]], Path]] = {
+            'fillnet': (self._train_fillnet, FILLNET_OUTPUT),
+            'alpha': (lambda f: train_alpha(force=f), ALPHA_OUTPUT),
+            'rugguard': (lambda f: train_rugguard(force=f), RUGGUARD_OUTPUT),
+            'survival': (lambda f: train_survival(force=f), SURVIVAL_OUTPUT),
+        }
+        outcomes: Dict[str, str] = {}
+        for name, (train, output) in trainers.items():
+            if models is not None and name not in models:
+                outcomes[name] = 'stable'
+                self.metrics.inc('trainer_daemon_runs_total', model=name, outcome='stable')
+                continue
+            started = time.perf_counter()
+            try:
+                result = train(force)
+                if result is None:
+                    outcome = 'unchanged'
+                else:
+                    promote_gpu.snapshot_production(name)
+                    write_model(output, result)
+                    outcome = str(result.get('status', 'unknown'))
+            except Exception as exc:
+                outcome = 'error'
+                print(f'trainer_daemon: {name} failed: {exc}', flush=True)
+            elapsed = time.perf_counter() - started
+            self.metrics.inc('trainer_daemon_runs_total', model=name, outcome=outcome)
+            self.metrics.set('trainer_daemon_train_seconds', elapsed, model=name)
+            self.metrics.set('trainer_daemon_last_train_epoch_seconds', time.time(), model=name)
+            if self.promote and outcome not in ('unchanged', 'error'):
+                line = promote_gpu.promote(name, force=force)
+                # "PROMOTE <name>=<ok|skipped|rolled_back> ..."
+                self.metrics.inc('trainer_daemon_promotions_total', model=name, outcome=line.split('=', 1)[1].split(' ', 1)[0])
+                print(line, flush=True)
+            outcomes[name] = outcome
+            self.last_train[name] = {
+                'outcome': outcome,
+                'seconds': round(elapsed, 3),
+                'at': datetime.now(timezone.utc).isoformat(timespec='seconds').replace('+00:00', 'Z'),
+            }
+        with self._lock:
+            self.rows_since_train = 0
+        self.last_train_ts = time.time()
+        print(f'trainer_daemon: retrain reason={reason}', json.dumps(outcomes), flush=True)
+        return outcomes
+
+    # -- loop -------------------------------------------------------------
+    def run(self) -> None:
+        self.poll()
+        while not self._stop.is_set():
+            reason = self._due()
+            if reason == 'drift':
+                drifted = self.check_drift()
+                if drifted:
+                    self.retrain(reason, models=drifted)
+            elif reason:
+                with self._lock:
+                    force = self._trigger_force
+                    self._trigger.clear()
+                    self._trigger_force = False
+                models = self._scheduled_models() if reason == 'schedule' and self.drift_gate and not force else None
+                self.retrain(reason, force=force, models=models)
+            # Wake early on POST /control/retrain
+            self._trigger.wait(self.poll_sec)
+            if not self._stop.is_set():
+                self.poll()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._trigger.set()
+
+    def health(self) -> Dict[str, Any]:
+        with self._lock:
+            rows = len(self.window)
+            pending = self.rows_since_train
+        return {
+            'status': 'ok' if self.last_train else 'starting',
+            'uptime_sec': int(time.time() - self.started),
+            'window_rows': rows,
+            'rows_since_train': pending,
+            'watermarks': dict(self.watermarks),
+            'last_train': self.last_train,
+            'drift': {name: {k: r.get(k) for k in ('status', 'decision', 'max_psi', 'max_ks', 'drifted')} for name, r in self.drift_reports.items()},
+        }
+
+
+def _handler(daemon: TrainerDaemon):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, code: int, body: str, content_type: str = 'application/json') -> None:
+            payload = body.encode()
+            self.send_response(code)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self) -> None:  # noqa: N802 - http.server API
+            if self.path == '/healthz':
+                self._send(200, json.dumps(daemon.health()))
+            elif self.path == '/metrics':
+                self._send(200, daemon.metrics.render(), 'text/plain; version=0.0.4')
+            else:
+                self._send(404, json.dumps({'error': 'not_found'}))
+
+        def do_POST(self) -> None:  # noqa: N802 - http.server API
+            if self.path.split('?')[0] == '/control/retrain':
+                daemon.request_retrain(force='force=1' in self.path)
+                self._send(202, json.dumps({'status': 'queued'}))
+            else:
+                self._send(404, json.dumps({'error': 'not_found'}))
+
+        def log_message(self, format: str, *args: Any) -> None:
+            return
+
+    return Handler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--interval-min', type=float, default=60.0, help='scheduled retrain interval')
+    parser.add_argument('--poll-sec', type=float, default=30.0, help='source-table polling interval')
+    parser.add_argument('--min-new-rows', type=int, default=0, help='retrain once this many new rows arrived (0 = off)')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1, help='worker processes for per-route fits')
+    parser.add_argument('--drift-min', type=float, default=30.0, help='drift check interval; drifted models retrain off-schedule (0 = off)')
+    parser.add_argument('--no-drift-gate', action='store_true', help='retrain every model on schedule even if its inputs have not drifted')
+    parser.add_argument('--no-promote', action='store_true', help='train candidates without running promote_gpu gating')
+    args = parser.parse_args()
+
+    daemon = TrainerDaemon(
+        interval_sec=args.interval_min * 60.0,
+        poll_sec=args.poll_sec,
+        min_new_rows=args.min_new_rows,
+        jobs=max(1, args.jobs),
+        promote=not args.no_promote,
+        drift_sec=args.drift_min * 60.0,
+        drift_gate=not args.no_drift_gate,
+    )
+    server = ThreadingHTTPServer(('0.0.0.0', args.port), _handler(daemon))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f'trainer_daemon: listening on :{args.port}', flush=True)
+    try:
+        daemon.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon.stop()
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
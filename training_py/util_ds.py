@@ -1,18 +1,44 @@
 import os
 import sqlite3
 import datetime as dt
-from typing import Tuple, Optional, List, Dict, Any
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import closing
+from itertools import repeat
+from typing import Tuple, Optional, List, Dict, Any, Iterator
 
 import numpy as np
 import pandas as pd
 
+from compact_ds import (
+    CompactDataset,
+    adopt_categories,
+    concat_datasets,
+    empty_dataset,
+    iter_compact,
+    read_compact,
+    shared_dictionary,
+)
+from fingerprint import compact_fingerprint
+from reservoir import StratifiedReservoir, sample_stratified
+
 DEFAULT_DB = os.environ.get('PERSISTENCE_SQLITE_PATH', './data/trenches.db')
+# Time-sharded window reads: N read-only connections, each shard in its own worker.
+# 'process' sidesteps the GIL for row conversion; 'thread' avoids pickling the shards back.
+READ_SHARDS = int(os.environ.get('TRAINING_READ_SHARDS', '1'))
+READ_EXECUTOR = os.environ.get('TRAINING_READ_EXECUTOR', 'process')
+# 'parquet' builds the backtest window from the persistence Parquet exports (PARQUET_OUTPUT_DIR).
+# Backtest only: the training views derive from exec_outcomes/social_posts, which are not exported.
+BACKTEST_BACKEND = os.environ.get('BACKTEST_DATA_BACKEND', 'sqlite')
 
 
 def _connect(db_path: str = DEFAULT_DB) -> sqlite3.Connection:
     return sqlite3.connect(db_path)
 
 
+def _connect_readonly(db_path: str = DEFAULT_DB) -> sqlite3.Connection:
+    return sqlite3.connect(f'file:{db_path}?mode=ro', uri=True, check_same_thread=False)
+
+
 def _read_query(conn: sqlite3.Connection, sql: str, params: Tuple = ()) -> pd.DataFrame:
     try:
         return pd.read_sql_query(sql, conn, params=params)
@@ -20,10 +46,108 @@ def _read_query(conn: sqlite3.Connection, sql: str, params: Tuple = ()) -> pd.Da
         return pd.DataFrame()
 
 
-def time_bounds(days: int = 14) -> Tuple[str, str]:
-    now = dt.datetime.utcnow()
-    start = now - dt.timedelta(days=days)
-    return start.replace(microsecond=0).isoformat() + 'Z', now.replace(microsecond=0).isoformat() + 'Z'
+def time_bounds(days: int = 14) -> Tuple[int, int]:
+    # Epoch seconds: the views' ts is INTEGER, and SQLite orders every integer before any text
+    now = int(dt.datetime.now(dt.timezone.utc).timestamp())
+    return now - int(days * 86400), now
+
+
+def shard_bounds(days: int = 14, shards: int = 1) -> List[Tuple[int, int]]:
+    """Split the time_bounds window into `shards` contiguous half-open ranges."""
+    start, end = time_bounds(days)
+    shards = max(1, shards)
+    edges = [start + (end - start) * i // shards for i in range(shards)] + [end]
+    return list(zip(edges[:-1], edges[1:]))
+
+
+FILL_LABELS = ('y_fill', 'y_slip_bps', 'y_ttl_ms')
+ALPHA_LABELS = ('y_payoff_10m', 'y_payoff_60m')
+RUG_LABELS = ('label_rug',)
+
+
+def _read_compact(sql: str, params: Tuple = (), ts_col: str = 'ts') -> CompactDataset:
+    with _connect() as conn:
+        return read_compact(conn, sql, params, ts_col=ts_col)
+
+
+def _read_shard(db_path: str, sql: str, params: Tuple, ts_col: str) -> Tuple[CompactDataset, Dict[str, List[str]]]:
+    with closing(_connect_readonly(db_path)) as conn:
+        ds = read_compact(conn, sql, params, ts_col=ts_col)
+    return ds, {name: list(shared_dictionary(name).values) for name in ds.codes}
+
+
+def _read_window(sql: str, days: int, ts_col: str = 'ts', shards: Optional[int] = None) -> CompactDataset:
+    """
+    Read `sql` (bound to a half-open [start, end) ts window) over the last
+    `days`, split into time shards read in parallel when shards > 1.
+    """
+    shards = READ_SHARDS if shards is None else shards
+    if shards <= 1:
+        return _read_compact(sql, time_bounds(days), ts_col)
+    bounds = shard_bounds(days, shards)
+    in_process = READ_EXECUTOR == 'thread'
+    pool_cls = ThreadPoolExecutor if in_process else ProcessPoolExecutor
+    with pool_cls(max_workers=shards) as pool:
+        results = list(pool.map(_read_shard, repeat(DEFAULT_DB), repeat(sql), bounds, repeat(ts_col)))
+    parts = [ds if in_process else adopt_categories(ds, values) for ds, values in results]
+    # Shards are disjoint, ascending and individually ts-sorted, so plain concatenation stays ordered
+    return concat_datasets(parts)
+
+
+def _label(ds: CompactDataset, name: str) -> pd.Series:
+    column = ds.column(name)
+    if column is None:
+        return pd.Series(dtype=float)
+    return pd.Series(column, copy=False)
+
+
+def _feature_frame(ds: CompactDataset, labels: Tuple[str, ...]) -> pd.DataFrame:
+    X = ds.frame(exclude=(*labels, 'mint', 'txid'))
+    X.attrs['fingerprint'] = compact_fingerprint(ds)
+    return X
+
+
+# This assumes a denormalized view exists; otherwise an empty dataset comes back
+FILL_SQL = """
+    SELECT *
+    FROM fill_training_view
+    WHERE ts >= ? AND ts < ?
+"""
+
+
+def get_fillnet_compact(days: int = 14, shards: Optional[int] = None) -> CompactDataset:
+    return _read_window(FILL_SQL, days, shards=shards)
+
+
+def _sample_shard(sql: str, params: Tuple, reservoir: StratifiedReservoir) -> StratifiedReservoir:
+    with closing(_connect_readonly()) as conn:
+        sample_stratified(iter_compact(conn, sql, params), reservoir)
+    return reservoir
+
+
+def get_fillnet_sample(
+    days: int = 14, reservoir: Optional[StratifiedReservoir] = None, shards: Optional[int] = None
+) -> Tuple[CompactDataset, np.ndarray]:
+    """
+    One streaming pass over fill_training_view through a stratified reservoir
+    (source x route x y_fill). Returns (sample, importance weights). With
+    shards > 1 each time shard fills its own reservoir on a thread (they must
+    share category dictionaries) and the shards are merged in order.
+    """
+    reservoir = reservoir or StratifiedReservoir('y_fill')
+    shards = READ_SHARDS if shards is None else shards
+    try:
+        if shards <= 1:
+            with _connect() as conn:
+                return sample_stratified(iter_compact(conn, FILL_SQL, time_bounds(days)), reservoir)
+        bounds = shard_bounds(days, shards)
+        with ThreadPoolExecutor(max_workers=shards) as pool:
+            parts = list(pool.map(_sample_shard, repeat(FILL_SQL), bounds, (reservoir.empty_like(i + 1) for i in range(shards))))
+        for part in parts:
+            reservoir.merge(part)
+        return reservoir.result()
+    except Exception:
+        return empty_dataset(), np.empty(0, dtype=np.float32)
 
 
 def get_fillnet_dataset(days: int = 14) -> Tuple[pd.DataFrame, pd.Series, pd.Series, pd.Series, List[str]]:
@@ -31,80 +155,326 @@ def get_fillnet_dataset(days: int = 14) -> Tuple[pd.DataFrame, pd.Series, pd.Ser
     Returns (X, y_fill, y_slip, y_ttl, feature_names)
     Falls back to empty DataFrames if no data.
     """
-    start, end = time_bounds(days)
-    with _connect() as conn:
-        # This assumes a denormalized view exists; otherwise stub empty frames
-        df = _read_query(
-            conn,
-            """
-            SELECT *
-            FROM fill_training_view
-            WHERE ts BETWEEN ? AND ?
-            """,
-            (start, end),
-        )
-    if df.empty:
+    ds = get_fillnet_compact(days)
+    if ds.empty:
         return pd.DataFrame(), pd.Series(dtype=float), pd.Series(dtype=float), pd.Series(dtype=float), []
+    X = _feature_frame(ds, FILL_LABELS)
+    return X, _label(ds, 'y_fill'), _label(ds, 'y_slip_bps'), _label(ds, 'y_ttl_ms'), list(X.columns)
 
-    # Basic feature selection aligned with serving-side features (placeholder: drop obvious labels/ids)
-    label_fill = df.get('y_fill', pd.Series(dtype=float))
-    label_slip = df.get('y_slip_bps', pd.Series(dtype=float))
-    label_ttl = df.get('y_ttl_ms', pd.Series(dtype=float))
-    drop_cols = {'y_fill', 'y_slip_bps', 'y_ttl_ms', 'ts', 'mint', 'txid'} & set(df.columns)
-    X = df.drop(columns=list(drop_cols))
-    feature_names = list(X.columns)
-    return X, label_fill, label_slip, label_ttl, feature_names
 
+# Base-table reads mirroring fill_training_view's projection, for rowid-watermark polling.
+# Same column order as the view so increments concatenate onto a view-loaded window.
+_FILL_INCREMENT_SQL = """
+    SELECT
+      (CASE WHEN ts > 20000000000 THEN ts/1000 ELSE ts END) AS ts,
+      route,
+      mint,
+      COALESCE(filled, 0)            AS y_fill,
+      COALESCE(slippage_bps_real, 0) AS y_slip_bps,
+      COALESCE(time_to_land_ms, 0)   AS y_ttl_ms,
+      COALESCE(slippage_bps_req, 0)  AS req_slippage_bps,
+      COALESCE(cu_price, 0)          AS req_cu_price,
+      '{source}'                     AS source
+    FROM {table}
+    WHERE rowid > ? AND rowid <= ?{route_filter}
+      AND (CASE WHEN ts > 20000000000 THEN ts/1000 ELSE ts END) >= ?
+"""
+FILL_SOURCE_TABLES = {'exec_outcomes': 'real', 'sim_exec_outcomes': 'sim'}
+# The view drops route-less rows from exec_outcomes only; sim rows keep a NULL route
+_ROUTE_REQUIRED = ('exec_outcomes',)
 
-def get_alpha_dataset(days: int = 14) -> Tuple[pd.DataFrame, pd.Series, pd.Series, List[str]]:
-    start, end = time_bounds(days)
+
+def max_rowid(table: str) -> int:
     with _connect() as conn:
-        df = _read_query(
-            conn,
-            """
-            SELECT * FROM alpha_training_view
-            WHERE ts BETWEEN ? AND ?
-            """,
-            (start, end),
-        )
-    if df.empty:
+        try:
+            row = conn.execute(f'SELECT MAX(rowid) FROM {table}').fetchone()
+        except sqlite3.Error:
+            return 0
+    return int(row[0] or 0) if row else 0
+
+
+def get_fillnet_increment(table: str, after_rowid: int, upto_rowid: int, since_ts: int) -> CompactDataset:
+    route_filter = '\n      AND route IS NOT NULL' if table in _ROUTE_REQUIRED else ''
+    sql = _FILL_INCREMENT_SQL.format(table=table, source=FILL_SOURCE_TABLES[table], route_filter=route_filter)
+    return _read_compact(sql, (after_rowid, upto_rowid, since_ts))
+
+
+def get_alpha_compact(days: int = 14, shards: Optional[int] = None) -> CompactDataset:
+    return _read_window(
+        """
+        SELECT * FROM alpha_training_view
+        WHERE entry_ts >= ? AND entry_ts < ?
+        """,
+        days,
+        ts_col='entry_ts',
+        shards=shards,
+    )
+
+
+def get_alpha_dataset(days: int = 14) -> Tuple[pd.DataFrame, pd.Series, pd.Series, List[str]]:
+    ds = get_alpha_compact(days)
+    if ds.empty:
         return pd.DataFrame(), pd.Series(dtype=float), pd.Series(dtype=float), []
-    y10 = df.get('y_payoff_10m', pd.Series(dtype=float))
-    y60 = df.get('y_payoff_60m', pd.Series(dtype=float))
-    drop_cols = {'y_payoff_10m', 'y_payoff_60m', 'ts', 'mint'} & set(df.columns)
-    X = df.drop(columns=list(drop_cols))
-    return X, y10, y60, list(X.columns)
+    X = _feature_frame(ds, ALPHA_LABELS)
+    return X, _label(ds, 'y_payoff_10m'), _label(ds, 'y_payoff_60m'), list(X.columns)
+
+
+# rug_training_view is only (mint, label_rug); a mint's row is dated by when it was first
+# filled or given a verdict, so the window and the chronological split have a real time axis
+RUG_SQL = """
+    SELECT r.*, seen.ts AS ts
+    FROM rug_training_view r
+    JOIN (
+      SELECT mint, MIN(ts) AS ts FROM (
+        SELECT mint, (CASE WHEN ts > 20000000000 THEN ts/1000 ELSE ts END) AS ts
+        FROM exec_outcomes WHERE mint IS NOT NULL AND filled = 1
+        UNION ALL
+        SELECT mint, (CASE WHEN ts > 20000000000 THEN ts/1000 ELSE ts END) AS ts
+        FROM rug_verdicts
+      )
+      GROUP BY mint
+    ) seen ON seen.mint = r.mint
+    WHERE seen.ts >= ? AND seen.ts < ?
+"""
+
+
+def get_rugguard_compact(days: int = 14, shards: Optional[int] = None) -> CompactDataset:
+    return _read_window(RUG_SQL, days, shards=shards)
 
 
 def get_rugguard_dataset(days: int = 14) -> Tuple[pd.DataFrame, pd.Series, List[str]]:
-    start, end = time_bounds(days)
-    with _connect() as conn:
-        df = _read_query(
-            conn,
-            """
-            SELECT * FROM rug_training_view
-            WHERE ts BETWEEN ? AND ?
-            """,
-            (start, end),
-        )
-    if df.empty:
+    ds = get_rugguard_compact(days)
+    if ds.empty:
         return pd.DataFrame(), pd.Series(dtype=float), []
-    y = df.get('label_rug', pd.Series(dtype=float))
-    drop_cols = {'label_rug', 'ts', 'mint'} & set(df.columns)
-    X = df.drop(columns=list(drop_cols))
-    return X, y, list(X.columns)
+    X = _feature_frame(ds, RUG_LABELS)
+    return X, _label(ds, 'label_rug'), list(X.columns)
 
 
-def get_survival_dataset(days: int = 14) -> pd.DataFrame:
-    start, end = time_bounds(days)
-    with _connect() as conn:
-        df = _read_query(
-            conn,
-            """
-            SELECT * FROM survival_training_view
-            WHERE ts BETWEEN ? AND ?
-            """,
-            (start, end),
-        )
+def get_survival_dataset(days: int = 14, shards: Optional[int] = None) -> pd.DataFrame:
+    ds = _read_window(
+        """
+        SELECT * FROM survival_training_view
+        WHERE entry_ts >= ? AND entry_ts < ?
+        """,
+        days,
+        ts_col='entry_ts',
+        shards=shards,
+    )
+    df = ds.frame()
+    df.attrs['fingerprint'] = compact_fingerprint(ds)
     return df
 
+
+def _live_since_ms(hours: float) -> int:
+    return int((dt.datetime.utcnow() - dt.timedelta(hours=hours)).replace(tzinfo=dt.timezone.utc).timestamp() * 1000)
+
+
+def _read_text_sample(table: str, column: str, where: str, params: Tuple, max_rows: Optional[int]) -> List[str]:
+    """
+    Text column of the matching rows. With max_rows set, a rowid stride keeps
+    roughly max_rows evenly spread over the window, so callers that only
+    need a distribution never pull (or decode) the full table.
+    """
+    with _connect() as conn:
+        try:
+            stride = 1
+            if max_rows:
+                total = conn.execute(f'SELECT COUNT(*) FROM {table} WHERE {where}', params).fetchone()[0]
+                stride = max(1, -(-int(total) // max_rows))
+            sql = f'SELECT {column} FROM {table} WHERE {where} AND rowid % ? = 0'
+            return [row[0] for row in conn.execute(sql, (*params, stride)) if row[0]]
+        except sqlite3.Error:
+            return []
+
+
+_LIVE_TS_WHERE = '(CASE WHEN ts > 20000000000 THEN ts ELSE ts*1000 END) >= ?'
+
+
+def get_live_score_features(hours: float = 24.0, horizon: str = '10m', max_rows: Optional[int] = None) -> List[str]:
+    # Features are identical across horizons for one scoring pass, so read one horizon only
+    return _read_text_sample(
+        'scores', 'features_json', f'{_LIVE_TS_WHERE} AND horizon = ?', (_live_since_ms(hours), horizon), max_rows
+    )
+
+
+def get_live_fill_contexts(hours: float = 24.0, max_rows: Optional[int] = None) -> List[str]:
+    return _read_text_sample('fill_preds', 'ctx_json', _LIVE_TS_WHERE, (_live_since_ms(hours),), max_rows)
+
+
+def iter_fill_predictions(since_ms: int = 0, batch_rows: int = 50_000) -> Iterator[Tuple[np.ndarray, List[str], np.ndarray, List[str]]]:
+    """
+    Stream logged fill_preds as (ts_ms, routes, outputs, ctx_json) batches;
+    outputs is a float64 (rows x 3) block of p_fill, exp_slip_bps, exp_time_ms.
+    """
+    with _connect() as conn:
+        try:
+            cursor = conn.execute(
+                f"""
+                SELECT (CASE WHEN ts > 20000000000 THEN ts ELSE ts*1000 END), route, p_fill, exp_slip_bps, exp_time_ms, ctx_json
+                FROM fill_preds
+                WHERE {_LIVE_TS_WHERE}
+                ORDER BY rowid
+                """,
+                (since_ms,),
+            )
+        except sqlite3.Error:
+            return
+        while True:
+            rows = cursor.fetchmany(batch_rows)
+            if not rows:
+                return
+            ts, routes, p_fill, slip, ttl, ctx = zip(*rows)
+            outputs = np.array([p_fill, slip, ttl], dtype=np.float64).T
+            yield np.asarray(ts, dtype=np.int64), list(routes), outputs, list(ctx)
+
+
+def _window_ms(days: float) -> Tuple[int, int]:
+    now = dt.datetime.now(dt.timezone.utc)
+    return int((now - dt.timedelta(days=days)).timestamp() * 1000), int(now.timestamp() * 1000)
+
+
+# Closed trades with the candidate snapshot and latest rug verdict for their mint
+BACKTEST_TRADES_SQL = """
+    SELECT
+      so.ts, so.mint, so.notional, so.pnl_usd,
+      c.buys60, c.sells60, c.uniques60, c.lp_sol, c.spread_bps, c.age_sec,
+      rv.rug_prob
+    FROM sizing_outcomes so
+    LEFT JOIN candidates c ON c.mint = so.mint
+    LEFT JOIN (SELECT mint, rug_prob, MAX(ts) AS verdict_ts FROM rug_verdicts GROUP BY mint) rv ON rv.mint = so.mint
+    WHERE so.closed = 1
+      AND (CASE WHEN so.ts > 20000000000 THEN so.ts ELSE so.ts*1000 END) >= ?
+      AND (CASE WHEN so.ts > 20000000000 THEN so.ts ELSE so.ts*1000 END) < ?
+"""
+
+BACKTEST_EXECS_SQL = """
+    SELECT ts, filled, slippage_bps_real AS slip_bps
+    FROM exec_outcomes
+    WHERE (CASE WHEN ts > 20000000000 THEN ts ELSE ts*1000 END) >= ?
+      AND (CASE WHEN ts > 20000000000 THEN ts ELSE ts*1000 END) < ?
+"""
+
+
+def get_backtest_window(days: float = 14) -> Tuple[CompactDataset, CompactDataset]:
+    """(closed trades with features, exec outcomes) for the last `days`, both ts-sorted."""
+    if BACKTEST_BACKEND == 'parquet':
+        return _parquet_backtest_trades(days), empty_dataset()
+    bounds = _window_ms(days)
+    return _read_compact(BACKTEST_TRADES_SQL, bounds), _read_compact(BACKTEST_EXECS_SQL, bounds)
+
+
+# Candidate export fields -> the names BACKTEST_TRADES_SQL selects
+_EXPORT_CANDIDATE_COLUMNS = {
+    'buys60': 'buys60',
+    'sells60': 'sells60',
+    'uniques60': 'uniques60',
+    'lpSol': 'lp_sol',
+    'spreadBps': 'spread_bps',
+    'ageSec': 'age_sec',
+}
+# A trade's candidate snapshot can predate the window it closed in
+CANDIDATE_LOOKBACK_DAYS = 1
+
+
+def latest_before(keys: np.ndarray, ts: np.ndarray, query_keys: np.ndarray, query_ts: np.ndarray) -> np.ndarray:
+    """Row of the latest (key, ts) at or before each query for the same key, -1 when none."""
+    packed = (keys.astype(np.int64) << 33) | ts
+    order = np.argsort(packed, kind='stable')
+    pos = np.searchsorted(packed[order], (query_keys.astype(np.int64) << 33) | query_ts, side='right') - 1
+    found = order[np.maximum(pos, 0)]
+    return np.where((pos >= 0) & (keys[found] == query_keys), found, -1)
+
+
+def _parquet_backtest_trades(days: float) -> CompactDataset:
+    """
+    Export-backed trades for the backtest: trades with a realised pnl joined
+    as-of their fill time to the latest candidate snapshot of the mint. Rug
+    verdicts and exec outcomes are not exported, so those stay unset.
+    """
+    from parquet_ds import read_export
+
+    trades = read_export('trades', days, columns=('mint', 'price', 'quantity', 'pnl'))
+    if trades.empty or 'mint' not in trades.codes:
+        return empty_dataset()
+    trades = trades.take(np.flatnonzero(~np.isnan(trades.column('pnl'))))
+    snaps = read_export('candidates', days + CANDIDATE_LOOKBACK_DAYS, columns=('mint', *_EXPORT_CANDIDATE_COLUMNS))
+    columns = ['notional', 'pnl_usd', *_EXPORT_CANDIDATE_COLUMNS.values()]
+    values = np.full((len(trades), len(columns)), np.nan, dtype=np.float32)
+    values[:, 0] = trades.column('price') * trades.column('quantity')
+    values[:, 1] = trades.column('pnl')
+    if not snaps.empty and 'mint' in snaps.codes:
+        row = latest_before(snaps.codes['mint'], snaps.ts, trades.codes['mint'], trades.ts)
+        hit = row >= 0
+        for i, name in enumerate(_EXPORT_CANDIDATE_COLUMNS, start=2):
+            source = snaps.column(name)
+            if source is not None:
+                values[hit, i] = source[row[hit]]
+    return CompactDataset(trades.ts, values, columns, {'mint': trades.codes['mint']})
+
+
+def _iso_day(epoch_s: int) -> str:
+    # Day-granular string bound: skips most rows on a plain compare before strftime runs on the rest
+    return dt.datetime.fromtimestamp(epoch_s, tz=dt.timezone.utc).strftime('%Y-%m-%d')
+
+
+def iter_social_posts(start_s: int, end_s: int, batch_rows: int = 50_000) -> Iterator[Tuple[np.ndarray, List[str], List[str]]]:
+    """Stream social_posts captured in [start_s, end_s] as (epoch s, author_id, text) batches."""
+    with _connect() as conn:
+        try:
+            cursor = conn.execute(
+                """
+                SELECT ts, author_id, text FROM (
+                  SELECT CAST(strftime('%s', captured_at) AS INTEGER) AS ts, author_id, text
+                  FROM social_posts
+                  WHERE captured_at >= ? AND captured_at < ?
+                )
+                WHERE ts >= ? AND ts <= ?
+                """,
+                (_iso_day(start_s), _iso_day(end_s + 86400), start_s, end_s),
+            )
+        except sqlite3.Error:
+            return
+        while True:
+            rows = cursor.fetchmany(batch_rows)
+            if not rows:
+                return
+            ts, authors, texts = zip(*rows)
+            yield np.asarray(ts, dtype=np.int64), list(authors), list(texts)
+
+
+def get_author_quality() -> Dict[str, float]:
+    with _connect() as conn:
+        try:
+            return {author: float(quality) for author, quality in conn.execute('SELECT author, quality FROM author_features')}
+        except sqlite3.Error:
+            return {}
+
+
+def get_candidate_names() -> Dict[str, Tuple[str, str]]:
+    """mint -> (symbol, name) as the alpha ranker sees them when picking social keywords."""
+    with _connect() as conn:
+        try:
+            return {mint: (symbol or '', name or '') for mint, symbol, name in conn.execute('SELECT mint, symbol, name FROM candidates')}
+        except sqlite3.Error:
+            return {}
+
+
+def get_logged_alpha_features(start_s: int, end_s: int, horizon: str = '10m') -> Tuple[np.ndarray, List[str], List[str]]:
+    """(epoch s, mint, features_json) of alpha scores logged in [start_s, end_s], one horizon."""
+    with _connect() as conn:
+        try:
+            rows = conn.execute(
+                """
+                SELECT (CASE WHEN ts > 20000000000 THEN ts/1000 ELSE ts END) AS ts_s, mint, features_json
+                FROM scores
+                WHERE horizon = ?
+                  AND (CASE WHEN ts > 20000000000 THEN ts/1000 ELSE ts END) BETWEEN ? AND ?
+                """,
+                (horizon, start_s, end_s),
+            ).fetchall()
+        except sqlite3.Error:
+            rows = []
+    if not rows:
+        return np.empty(0, dtype=np.int64), [], []
+    ts, mints, payloads = zip(*rows)
+    return np.asarray(ts, dtype=np.int64), list(mints), list(payloads)